@@ -1,64 +1,96 @@
 """
 Fraud Detection MVP (Airflow 3)
 Graph-friendly DAG with clear task bubbles:
-- Ingestion: fetch transaction from Jedha
-- Inference: prepare payload + call HF Space
-- Persistence: store result into NeonDB
+- Ingestion: poll transactions from Jedha for a time window (micro-batch)
+- Inference: prepare payloads + one batch call to the HF Space
+- Persistence: store results into NeonDB with one bulk upsert
 """
 
 from __future__ import annotations
-import json
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 import requests
-import psycopg2
 
 from airflow.decorators import dag, task
 from airflow.models import Variable
 from airflow.utils.task_group import TaskGroup
 from airflow.operators.empty import EmptyOperator
 
-# Config
-JEDHA_API = "https://charlestng-real-time-fraud-detection.hf.space/current-transactions"
-HF_SPACE_API = "https://cnoret-fraud-detection-api.hf.space/predict"
-NEON_DB_URI = Variable.get("NEON_DB_URI")
-DEFAULTS = {
-    "amt": 100.0,
-    "cc_num": 4000000000000002,
-    "zip": 12345,
-    "city_pop": 50000,
-    "lat": 40.7128,
-    "long": -74.0060,
-    "merch_lat": 40.7128,
-    "merch_long": -74.0060,
-    "first": "John",
-    "last": "Doe",
-    "gender": "M",
-    "street": "123 Main St",
-    "city": "Anytown",
-    "state": "NY",
-    "job": "Engineer",
-    "dob": "1990-01-01",
-    "merchant": "Generic Store",
-    "category": "misc_pos",
-    "trans_date_trans_time": "2020-06-15 12:00:00",
-    "unix_time": 1_592_222_400,
-}
+# Steps shared with the streaming worker (fraud_stream_worker.py)
+from fraud_pipeline import (
+    DEFAULT_WRITE_METHOD,
+    FALLBACK_COLUMNS,
+    HF_SPACE_BATCH_API,
+    JEDHA_API,
+    MODEL_VERSION_HEADER,
+    batch_request,
+    fetch_schema,
+    log_alerts,
+    migrate,
+    parse_feed,
+    parse_predictions,
+    pooled_connection,
+    prepare_batch,
+    upsert_rows,
+)
+
+# Config: Airflow Variables are read inside the tasks, never at DAG parse time
+# (the scheduler re-parses this file continuously, each read is a metadata DB query)
+
+# Model schema cached across runs in an Airflow Variable (shared by all workers):
+# refreshed from /health when older than FRAUD_SCHEMA_TTL_S or when /predict/batch
+# reports another model version.
+SCHEMA_CACHE_VAR = "FRAUD_SCHEMA_CACHE"
+
+
+def schema_ttl_s() -> float:
+    """Max age of the cached schema in seconds; call it from tasks only."""
+    return float(Variable.get("FRAUD_SCHEMA_TTL_S", default_var="86400"))
+
+
+def refresh_schema() -> Dict[str, Any]:
+    """Fetch the model schema from /health and store it in the cache Variable."""
+    version, columns = fetch_schema()
+    schema = {"model_version": version, "columns": columns, "fetched_at": time.time()}
+    Variable.set(SCHEMA_CACHE_VAR, schema, serialize_json=True)
+    logging.info("Cached schema of model %s (%d columns)", version, len(columns))
+    return schema
+
+
+def cached_schema(ttl_s: float) -> Dict[str, Any]:
+    """Model schema from the cache, refreshed once stale; fallback if never fetched."""
+    schema = Variable.get(SCHEMA_CACHE_VAR, default_var=None, deserialize_json=True)
+    if schema and time.time() - schema.get("fetched_at", 0) < ttl_s:
+        return schema
+    try:
+        return refresh_schema()
+    except Exception as e:
+        if schema:
+            logging.warning("Health check failed (%s). Using stale cached schema.", e)
+            return schema
+        logging.warning("Health check failed (%s). Using fallback schema.", e)
+        return {"model_version": None, "columns": list(FALLBACK_COLUMNS)}
+
 
 DOC_MD = """
 # Fraud Detection MVP
 
 **Flow**
-1. **Ingestion** – fetch a live transaction from Jedha API.  
-2. **Inference** – prepare payload (schema align + timestamp fix) then call **HF Space** for prediction.  
-3. **Persistence** – store results into **NeonDB**.
-
-**Key Vars**
-- `JEDHA_API`, `HF_SPACE_API`, `HEALTH_URL`, `NEON_DB_URI` (Airflow Variables)
-
-**Table**
+0. **Setup** – apply pending schema migrations (versioned in `fraud_schema_version`), alongside ingestion.  
+1. **Ingestion** – poll live transactions from Jedha API during a time window, deduplicated by `trans_num`.  
+2. **Inference** – prepare payloads (schema align + timestamp fix, vectorized) then one **HF Space** `/predict/batch` call.  
+3. **Persistence** – store all results into **NeonDB** with one bulk upsert over a pooled connection.
+
+**Key Vars** (Airflow Variables read by the tasks at run time, not at parse time)
+- `NEON_DB_URI`; `JEDHA_API`, `HF_SPACE_BATCH_API`, `HEALTH_URL` in `fraud_pipeline.py`
+- `FRAUD_BATCH_WINDOW_S` (45), `FRAUD_POLL_INTERVAL_S` (2), `FRAUD_BATCH_MAX_SIZE` (1000) – micro-batch window
+- `FRAUD_SCHEMA_CACHE` – model schema cached by the DAG (refreshed after `FRAUD_SCHEMA_TTL_S`, 86400, or on a new model version)
+- `FRAUD_WRITE_METHOD` (`values`) – `prepared` on the direct (non-pooler) endpoint, `copy` for large batches
+
+**Table** (migration 1 in `fraud_pipeline.MIGRATIONS`)
 ```sql
 CREATE TABLE IF NOT EXISTS fraud_transactions (
   transaction_id TEXT PRIMARY KEY,
@@ -78,6 +110,7 @@ CREATE TABLE IF NOT EXISTS fraud_transactions (
     start_date=datetime(2025, 1, 1),
     schedule=timedelta(minutes=1),
     catchup=False,
+    max_active_runs=1,  # polling windows must not overlap
     default_args={
         "owner": "christophe_noret",
         "retries": 1,
@@ -90,140 +123,145 @@ def automatic_fraud_detection():
     start = EmptyOperator(task_id="start")
     end = EmptyOperator(task_id="end")
 
+    # ------------- #
+    # Setup         #
+    # ------------- #
+    with TaskGroup(
+        group_id="setup", tooltip="Migrate the NeonDB schema if it is behind"
+    ) as setup:
+
+        @task(task_id="migrate_schema")
+        def migrate_schema() -> int:
+            """Apply pending schema migrations, no DDL when up to date."""
+            db_uri = Variable.get("NEON_DB_URI")
+            with pooled_connection(db_uri) as conn, conn.cursor() as cur:
+                version = migrate(cur)
+            logging.info("NeonDB schema at version %d", version)
+            return version
+
+        migrate_schema()
+
     # ------------- #
     # Ingestion     #
     # ------------- #
     with TaskGroup(
-        group_id="ingestion", tooltip="Fetch a transaction from Jedha API"
+        group_id="ingestion", tooltip="Poll a micro-batch of transactions from Jedha"
     ) as ingestion:
 
-        @task(task_id="fetch_transaction")
-        def fetch_transaction() -> Dict[str, Any]:
-            """Fetch 1 transaction from Jedha (Pandas orient=split)."""
-            logging.info("Fetching transaction from Jedha…")
-            r = requests.get(JEDHA_API, timeout=30)
-            r.raise_for_status()
-            raw_text = r.text.strip().strip('"').replace('\\"', '"')
-            data = json.loads(raw_text)
-
-            if "data" in data and "columns" in data:
-                import pandas as pd
-
-                df = pd.DataFrame(data["data"], columns=data["columns"])
-                tx = df.iloc[0].to_dict()
-                logging.info(
-                    "Fetched transaction: $%s at %s", tx.get("amt"), tx.get("merchant")
-                )
-                return tx
-            raise ValueError("Invalid Jedha API response format")
+        @task(task_id="fetch_transactions")
+        def fetch_transactions() -> List[Dict[str, Any]]:
+            """Poll Jedha during the batch window, deduplicated by trans_num."""
+            # Micro-batching: poll the feed for window_s seconds (keep it below the
+            # 1 min schedule), every poll_s, up to max_size unique transactions.
+            # window_s = 0 polls once, like the former one-transaction-per-run mode.
+            window_s = float(Variable.get("FRAUD_BATCH_WINDOW_S", default_var="45"))
+            poll_s = float(Variable.get("FRAUD_POLL_INTERVAL_S", default_var="2"))
+            max_size = int(Variable.get("FRAUD_BATCH_MAX_SIZE", default_var="1000"))
+            logging.info(
+                "Polling Jedha for %.0fs (every %.0fs, max %d transactions)…",
+                window_s,
+                poll_s,
+                max_size,
+            )
+            batch: Dict[str, Dict[str, Any]] = {}
+            polls = errors = duplicates = 0
+            deadline = time.monotonic() + window_s
+            with requests.Session() as session:  # keep-alive across polls
+                while True:
+                    polls += 1
+                    try:
+                        r = session.get(JEDHA_API, timeout=30)
+                        r.raise_for_status()
+                        for tx in parse_feed(r.text):
+                            key = tx.get("trans_num") or f"_no_trans_num_{len(batch)}"
+                            if key in batch:
+                                duplicates += 1
+                            else:
+                                batch[key] = tx
+                    except (requests.RequestException, ValueError) as e:
+                        errors += 1
+                        logging.warning("Poll %d failed: %s", polls, e)
+                    remaining = deadline - time.monotonic()
+                    if len(batch) >= max_size or remaining <= 0:
+                        break
+                    time.sleep(min(poll_s, remaining))
+
+            if not batch and errors == polls:
+                raise RuntimeError(f"All {polls} polls of the Jedha API failed")
+            transactions = list(batch.values())[:max_size]
+            logging.info(
+                "Fetched %d transactions (%d polls, %d duplicates, %d failed polls)",
+                len(transactions),
+                polls,
+                duplicates,
+                errors,
+            )
+            return transactions
 
-        tx_dict = fetch_transaction()
+        tx_batch = fetch_transactions()
 
     # ------------- #
     # Inference     #
     # ------------- #
     with TaskGroup(
-        group_id="inference", tooltip="Prepare payload and predict"
+        group_id="inference", tooltip="Prepare payloads and predict in one batch"
     ) as inference:
 
-        @task(task_id="prepare_payload")
-        def prepare_payload(transaction: Dict[str, Any]) -> Dict[str, Any]:
+        @task(task_id="prepare_payloads")
+        def prepare_payloads(
+            transactions: List[Dict[str, Any]],
+        ) -> List[Dict[str, Any]]:
             """Align fields with model schema; fix timestamps; fill defaults."""
-            # Get expected columns from model's /health
-            try:
-                resp = requests.get(HEALTH_URL, timeout=10)
-                resp.raise_for_status()
-                health = resp.json()
-                expected_columns = health.get("expected_numeric", []) + health.get(
-                    "expected_categorical", []
-                )
-            except Exception as e:
-                logging.warning("Health check failed (%s). Using fallback schema.", e)
-                expected_columns = [
-                    "cc_num",
-                    "amt",
-                    "zip",
-                    "lat",
-                    "long",
-                    "city_pop",
-                    "unix_time",
-                    "merch_lat",
-                    "merch_long",
-                    "trans_date_trans_time",
-                    "merchant",
-                    "category",
-                    "first",
-                    "last",
-                    "gender",
-                    "street",
-                    "city",
-                    "state",
-                    "job",
-                    "dob",
-                    "trans_num",
-                ]
-
-            # Timestamp normalization (mirror of local client)
-            if "current_time" in transaction and "unix_time" in expected_columns:
-                raw_ms = transaction["current_time"]
-                if (
-                    raw_ms > 1_640_995_200_000
-                ):  # > 2022-01-01 in ms → rescale into 2020 range
-                    training_start = 1_577_836_800  # 2020-01-01 (s)
-                    year_seconds = 31_536_000
-                    transaction["unix_time"] = (
-                        training_start + (raw_ms // 1000) % year_seconds
-                    )
-                else:
-                    transaction["unix_time"] = raw_ms // 1000
-
-            if (
-                "unix_time" in transaction
-                and "trans_date_trans_time" in expected_columns
-            ):
-                try:
-                    dt = datetime.fromtimestamp(transaction["unix_time"])
-                    transaction["trans_date_trans_time"] = dt.strftime(
-                        "%Y-%m-%d %H:%M:%S"
-                    )
-                except Exception:
-                    transaction["trans_date_trans_time"] = DEFAULTS[
-                        "trans_date_trans_time"
-                    ]
-
-            payload = {}
-            for col in expected_columns:
-                if col in transaction and transaction[col] is not None:
-                    payload[col] = transaction[col]
-                elif col in DEFAULTS:
-                    payload[col] = DEFAULTS[col]
-                else:
-                    import time
-
-                    payload[col] = (
-                        f"default_{int(time.time())}" if col == "trans_num" else 0
-                    )
-            return payload
+            if not transactions:
+                return []
+            # Expected columns cached across runs, no /health call unless stale
+            columns = cached_schema(schema_ttl_s())["columns"]
+            t0 = time.perf_counter()
+            payloads = prepare_batch(transactions, columns)
+            logging.info(
+                "Prepared %d payloads in %.1f ms",
+                len(payloads),
+                (time.perf_counter() - t0) * 1000,
+            )
+            return payloads
 
         @task(task_id="predict_fraud")
-        def predict_fraud(payload: Dict[str, Any]) -> Dict[str, Any]:
-            """Call HF Space model endpoint and return prediction + prob."""
-            logging.info("Calling model endpoint…")
-            resp = requests.post(HF_SPACE_API, json={"data": payload}, timeout=30)
+        def predict_fraud(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            """Call the HF Space batch endpoint once for the whole batch."""
+            if not payloads:
+                return []
+            logging.info("Calling model batch endpoint (%d payloads)…", len(payloads))
+            t0 = time.perf_counter()
+            resp = requests.post(
+                HF_SPACE_BATCH_API, json=batch_request(payloads), timeout=60
+            )
             resp.raise_for_status()
-            pred = resp.json()
-            result = {
-                "probability": float(pred.get("probability", 0.0)),
-                "prediction": int(pred.get("prediction", 0)),
-            }
+            preds = parse_predictions(resp.json(), len(payloads))
+            elapsed = time.perf_counter() - t0
+
+            # New model behind the Space: refresh the cached schema for the next runs
+            served = resp.headers.get(MODEL_VERSION_HEADER)
+            cached = cached_schema(schema_ttl_s())
+            if served and served != cached["model_version"]:
+                logging.warning(
+                    "Model %s served the batch, schema cached for %s: refreshing",
+                    served,
+                    cached["model_version"],
+                )
+                try:
+                    refresh_schema()
+                except Exception as e:
+                    logging.warning("Schema refresh failed (%s), next run retries", e)
             logging.info(
-                "Model → prob=%.6f, pred=%s",
-                result["probability"],
-                result["prediction"],
+                "Model → %d predictions, %d flagged, in %.2fs (%.0f tx/s)",
+                len(preds),
+                sum(p["prediction"] for p in preds),
+                elapsed,
+                len(preds) / elapsed if elapsed else float("inf"),
             )
-            return result
+            return preds
 
-        prepared = prepare_payload(tx_dict)
+        prepared = prepare_payloads(tx_batch)
         pred_out = predict_fraud(prepared)
 
     # ------------- #
@@ -234,84 +272,41 @@ def automatic_fraud_detection():
     ) as persistence:
 
         @task(task_id="store_in_neon")
-        def store_in_neon(transaction: Dict[str, Any], pred: Dict[str, Any]) -> None:
-            logging.info("Storing into NeonDB…")
-            conn = psycopg2.connect(NEON_DB_URI)
-            cur = conn.cursor()
-
-            # 1) Create table if not exists (base columns)
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS fraud_transactions (
-                  transaction_id TEXT,
-                  amount DOUBLE PRECISION,
-                  merchant TEXT,
-                  fraud_probability DOUBLE PRECISION,
-                  prediction INTEGER
-                );
-                """
-            )
-
-            # 2) Ensure audit columns + uniqueness
-            cur.execute(
-                """
-                ALTER TABLE fraud_transactions
-                  ADD COLUMN IF NOT EXISTS inserted_at TIMESTAMPTZ DEFAULT NOW();
-                """
-            )
-            cur.execute(
-                """
-                ALTER TABLE fraud_transactions
-                  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
-                """
-            )
-            # Ensure a unique index so ON CONFLICT works even if table was created earlier without PK
-            cur.execute(
-                """
-                CREATE UNIQUE INDEX IF NOT EXISTS fraud_transactions_transaction_id_uidx
-                ON fraud_transactions (transaction_id);
-                """
+        def store_in_neon(
+            transactions: List[Dict[str, Any]], preds: List[Dict[str, Any]]
+        ) -> None:
+            if not transactions:
+                logging.info("No transactions in this window, nothing to store")
+                return
+            # "values" (one multi-row INSERT), "prepared" (prepared statement fed with
+            # arrays, direct endpoint only) or "copy" (COPY into a temp table, then merge)
+            write_method = Variable.get(
+                "FRAUD_WRITE_METHOD", default_var=DEFAULT_WRITE_METHOD
             )
-
-            # 3) Upsert with safe column set
-            cur.execute(
-                """
-                INSERT INTO fraud_transactions (
-                    transaction_id, amount, merchant, fraud_probability, prediction
-                ) VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (transaction_id) DO UPDATE SET
-                    amount = EXCLUDED.amount,
-                    merchant = EXCLUDED.merchant,
-                    fraud_probability = EXCLUDED.fraud_probability,
-                    prediction = EXCLUDED.prediction,
-                    updated_at = NOW();
-                """,
-                (
-                    transaction.get("trans_num")
-                    or f"tx_{int(datetime.now().timestamp())}",
-                    float(transaction.get("amt", 0)),
-                    str(transaction.get("merchant", "Unknown"))[:255],
-                    float(pred.get("probability", 0.0)),
-                    int(pred.get("prediction", 0)),
-                ),
+            db_uri = Variable.get("NEON_DB_URI")
+            logging.info("Storing %d results into NeonDB…", len(transactions))
+            t0 = time.perf_counter()
+            with pooled_connection(db_uri) as conn, conn.cursor() as cur:
+                # Schema migrated by setup.migrate_schema: no DDL, one bulk upsert
+                t1 = time.perf_counter()
+                n_rows = upsert_rows(cur, transactions, preds, method=write_method)
+            elapsed = time.perf_counter() - t1
+            logging.info(
+                "Upserted %d rows (%s) in %.1f ms, %.0f rows/s (%.1f ms with connect)",
+                n_rows,
+                write_method,
+                elapsed * 1000,
+                n_rows / elapsed if elapsed else float("inf"),
+                (time.perf_counter() - t0) * 1000,
             )
 
-            conn.commit()
-            cur.close()
-            conn.close()
-
-            # Simple alert threshold
-            if float(pred.get("probability", 0.0)) > 0.001:
-                logging.warning(
-                    "FRAUD ALERT: prob=%.6f, amount=$%s",
-                    float(pred["probability"]),
-                    transaction.get("amt", 0),
-                )
+            log_alerts(transactions, preds)
 
-        store_in_neon(tx_dict, pred_out)
+        store_in_neon(tx_batch, pred_out)
 
     # Chain
     start >> ingestion >> inference >> persistence >> end
+    start >> setup >> persistence  # runs alongside ingestion
 
 
 dag = automatic_fraud_detection()
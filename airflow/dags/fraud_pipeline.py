@@ -0,0 +1,428 @@
+"""
+Fetch, prepare, predict and store steps of the fraud pipeline.
+
+Shared by the `automatic_fraud_detection` DAG, which runs them as tasks on
+each schedule tick, and by `fraud_stream_worker.py`, which runs them
+continuously in an asyncio pipeline. No Airflow imports here, so the worker
+can run anywhere.
+"""
+
+from __future__ import annotations
+import contextlib
+import csv
+import io
+import json
+import logging
+import threading
+import time
+import weakref
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Stdlib-only module of the serving package, mounted next to the DAGs
+from fraud_scoring.schema import DEFAULTS, MODEL_VERSION_HEADER
+
+JEDHA_API = "https://charlestng-real-time-fraud-detection.hf.space/current-transactions"
+SPACE_URL = "https://cnoret-fraud-detection-api.hf.space"
+HF_SPACE_API = SPACE_URL + "/predict"
+HF_SPACE_BATCH_API = SPACE_URL + "/predict/batch"
+HEALTH_URL = SPACE_URL + "/health"
+
+FALLBACK_COLUMNS = [
+    "cc_num",
+    "amt",
+    "zip",
+    "lat",
+    "long",
+    "city_pop",
+    "unix_time",
+    "merch_lat",
+    "merch_long",
+    "trans_date_trans_time",
+    "merchant",
+    "category",
+    "first",
+    "last",
+    "gender",
+    "street",
+    "city",
+    "state",
+    "job",
+    "dob",
+    "trans_num",
+]
+
+# Probability above which a stored transaction is logged as an alert
+ALERT_PROBABILITY = 0.001
+
+# Versioned schema migrations, applied once by migrate() (the DAG's setup task and
+# the stream worker's start) instead of running DDL before every write.
+# Append new versions, never edit an applied one.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (
+        1,
+        "fraud_transactions with audit columns and unique transaction_id",
+        [
+            # Create table if not exists (base columns)
+            """
+            CREATE TABLE IF NOT EXISTS fraud_transactions (
+              transaction_id TEXT,
+              amount DOUBLE PRECISION,
+              merchant TEXT,
+              fraud_probability DOUBLE PRECISION,
+              prediction INTEGER
+            );
+            """,
+            # Audit columns
+            """
+            ALTER TABLE fraud_transactions
+              ADD COLUMN IF NOT EXISTS inserted_at TIMESTAMPTZ DEFAULT NOW();
+            """,
+            """
+            ALTER TABLE fraud_transactions
+              ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+            """,
+            # Unique index so ON CONFLICT works even if table was created without PK
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS fraud_transactions_transaction_id_uidx
+            ON fraud_transactions (transaction_id);
+            """,
+        ],
+    ),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+SCHEMA_VERSION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS fraud_schema_version (
+      version INTEGER PRIMARY KEY,
+      description TEXT NOT NULL,
+      applied_at TIMESTAMPTZ DEFAULT NOW()
+    );
+"""
+
+UPSERT_COLUMNS = "transaction_id, amount, merchant, fraud_probability, prediction"
+
+UPSERT_SQL = f"""
+    INSERT INTO fraud_transactions ({UPSERT_COLUMNS}) VALUES %s
+    ON CONFLICT (transaction_id) DO UPDATE SET
+        amount = EXCLUDED.amount,
+        merchant = EXCLUDED.merchant,
+        fraud_probability = EXCLUDED.fraud_probability,
+        prediction = EXCLUDED.prediction,
+        updated_at = NOW();
+"""
+
+# Prepared path: one statement for any batch size, the rows are passed as arrays.
+# Prepared once per connection (server-side plan reused by every later batch), so it
+# needs a session-mode connection: not through a transaction-mode pooler.
+PREPARE_UPSERT_SQL = f"""
+    PREPARE fraud_upsert (text[], float8[], text[], float8[], int[]) AS
+    INSERT INTO fraud_transactions ({UPSERT_COLUMNS})
+    SELECT * FROM unnest($1, $2, $3, $4, $5)
+    ON CONFLICT (transaction_id) DO UPDATE SET
+        amount = EXCLUDED.amount,
+        merchant = EXCLUDED.merchant,
+        fraud_probability = EXCLUDED.fraud_probability,
+        prediction = EXCLUDED.prediction,
+        updated_at = NOW();
+"""
+
+EXECUTE_UPSERT_SQL = "EXECUTE fraud_upsert (%s, %s, %s, %s, %s);"
+
+# COPY path: stream rows into a session temp table, then merge with one statement.
+# The temp table lives as long as the (pooled) connection.
+STAGE_TABLE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS fraud_transactions_stage (
+      transaction_id TEXT,
+      amount DOUBLE PRECISION,
+      merchant TEXT,
+      fraud_probability DOUBLE PRECISION,
+      prediction INTEGER
+    );
+"""
+
+COPY_STAGE_SQL = (
+    f"COPY fraud_transactions_stage ({UPSERT_COLUMNS}) FROM STDIN WITH (FORMAT csv)"
+)
+
+MERGE_STAGE_SQL = f"""
+    INSERT INTO fraud_transactions ({UPSERT_COLUMNS})
+    SELECT {UPSERT_COLUMNS} FROM fraud_transactions_stage
+    ON CONFLICT (transaction_id) DO UPDATE SET
+        amount = EXCLUDED.amount,
+        merchant = EXCLUDED.merchant,
+        fraud_probability = EXCLUDED.fraud_probability,
+        prediction = EXCLUDED.prediction,
+        updated_at = NOW();
+    TRUNCATE fraud_transactions_stage;
+"""
+
+WRITE_METHODS = ("values", "prepared", "copy")
+# Works through any pooler; "prepared" needs the direct (non -pooler) endpoint
+DEFAULT_WRITE_METHOD = "values"
+
+# Connections per database URI, kept open across writes in the same process
+POOL_MAX_CONNECTIONS = 4
+
+_pools: Dict[str, Any] = {}
+_pools_lock = threading.Lock()
+# Connections on which fraud_upsert is prepared
+_prepared: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def parse_feed(text: str) -> List[Dict[str, Any]]:
+    """Transactions of one Jedha response (Pandas orient=split, JSON-encoded twice)."""
+    raw_text = text.strip().strip('"').replace('\\"', '"')
+    data = json.loads(raw_text)
+    if "data" in data and "columns" in data:
+        return [dict(zip(data["columns"], row)) for row in data["data"]]
+    raise ValueError("Invalid Jedha API response format")
+
+
+def columns_from_health(health: Dict[str, Any]) -> List[str]:
+    """Expected payload columns listed by a /health response."""
+    return health.get("expected_numeric", []) + health.get("expected_categorical", [])
+
+
+def fetch_schema(health_url: str = HEALTH_URL) -> Tuple[Optional[str], List[str]]:
+    """Model version and expected columns from /health, raises if unreachable."""
+    import requests
+
+    resp = requests.get(health_url, timeout=10)
+    resp.raise_for_status()
+    health = resp.json()
+    return health.get("model_version"), columns_from_health(health)
+
+
+def prepare_batch(
+    transactions: List[Dict[str, Any]], columns: List[str]
+) -> List[Dict[str, Any]]:
+    """Vectorized prepare_payload: timestamp fix and defaults for a whole batch."""
+    import numpy as np
+    import pandas as pd
+
+    df = pd.DataFrame(transactions)
+
+    # Timestamp normalization (mirror of local client)
+    if "current_time" in df and "unix_time" in columns:
+        raw_ms = pd.to_numeric(df["current_time"], errors="coerce")
+        training_start = 1_577_836_800  # 2020-01-01 (s)
+        year_seconds = 31_536_000
+        # > 2022-01-01 in ms → rescale into 2020 range
+        unix_time = np.where(
+            raw_ms > 1_640_995_200_000,
+            training_start + (raw_ms // 1000) % year_seconds,
+            raw_ms // 1000,
+        )
+        previous = df["unix_time"] if "unix_time" in df else np.nan
+        df["unix_time"] = pd.Series(unix_time, index=df.index).where(
+            raw_ms.notna(), previous
+        )
+
+    if "unix_time" in df and "trans_date_trans_time" in columns:
+        # Formatted in UTC, the time zone of the Airflow containers
+        unix_time = pd.to_numeric(df["unix_time"], errors="coerce")
+        formatted = pd.to_datetime(unix_time, unit="s", errors="coerce").dt.strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        formatted = formatted.fillna(DEFAULTS["trans_date_trans_time"])
+        if "trans_date_trans_time" in df:
+            formatted = formatted.where(unix_time.notna(), df["trans_date_trans_time"])
+        df["trans_date_trans_time"] = formatted
+
+    payload = pd.DataFrame(index=df.index)
+    for col in columns:
+        if col == "trans_num":
+            now = int(time.time())
+            fallback = pd.Series(
+                [f"default_{now}_{i}" for i in range(len(df))], index=df.index
+            )
+        else:
+            fallback = DEFAULTS.get(col, 0)
+        if col in df:
+            payload[col] = df[col].where(df[col].notna(), fallback)
+        else:
+            payload[col] = fallback
+    # Column lists → row dicts, much cheaper than DataFrame.to_dict(orient="records")
+    values = [payload[col].tolist() for col in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def batch_request(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Body of a /predict/batch call."""
+    return [{"data": payload} for payload in payloads]
+
+
+def parse_predictions(body: Dict[str, Any], expected: int) -> List[Dict[str, Any]]:
+    """Probability and prediction per payload from a /predict/batch response."""
+    predictions = body["predictions"]
+    if len(predictions) != expected:
+        raise ValueError(f"Got {len(predictions)} predictions for {expected} payloads")
+    return [
+        {
+            "probability": float(p.get("probability", 0.0)),
+            "prediction": int(p.get("prediction", 0)),
+        }
+        for p in predictions
+    ]
+
+
+def schema_version(cur) -> int:
+    """Applied schema version, 0 before the first migration."""
+    cur.execute("SELECT to_regclass('fraud_schema_version') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM fraud_schema_version")
+    return cur.fetchone()[0]
+
+
+def migrate(cur) -> int:
+    """Apply the pending MIGRATIONS, returns the schema version.
+
+    Up to date, this is two SELECTs and no DDL. Commit to release the lock.
+    """
+    current = schema_version(cur)
+    if current >= SCHEMA_VERSION:
+        return current
+    # Serializes concurrent migrators, e.g. a DAG run and the stream worker
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('fraud_schema_version'))")
+    cur.execute(SCHEMA_VERSION_TABLE_SQL)
+    current = schema_version(cur)  # another migrator may have been first
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        logging.info("Applying schema migration %d: %s", version, description)
+        for statement in statements:
+            cur.execute(statement)
+        cur.execute(
+            "INSERT INTO fraud_schema_version (version, description) VALUES (%s, %s)",
+            (version, description),
+        )
+        current = version
+    return current
+
+
+def connection_pool(db_uri: str):
+    """Process-wide psycopg2 pool for ``db_uri``, created on first use."""
+    from psycopg2.pool import ThreadedConnectionPool
+
+    with _pools_lock:
+        pool = _pools.get(db_uri)
+        if pool is None or pool.closed:
+            # TCP keepalives so idle pooled connections to Neon are not silently dropped
+            pool = _pools[db_uri] = ThreadedConnectionPool(
+                1, POOL_MAX_CONNECTIONS, db_uri, keepalives=1, keepalives_idle=30
+            )
+    return pool
+
+
+@contextlib.contextmanager
+def pooled_connection(db_uri: str) -> Iterator[Any]:
+    """Pooled connection: committed on success, closed instead of reused on error."""
+    pool = connection_pool(db_uri)
+    conn = pool.getconn()
+    failed = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        # Session state is unknown (a half-created fraud_upsert, an aborted
+        # transaction): closing discards it, the pool opens a fresh connection
+        failed = True
+        _prepared.discard(conn)
+        raise
+    finally:
+        pool.putconn(conn, close=failed or bool(conn.closed))
+
+
+def upsert_tuples(
+    transactions: Sequence[Dict[str, Any]], preds: Sequence[Dict[str, Any]]
+) -> List[Tuple[Any, ...]]:
+    """Rows of the upsert, one per transaction_id."""
+    now = int(datetime.now().timestamp())
+    rows = {}
+    for i, (tx, pred) in enumerate(zip(transactions, preds)):
+        transaction_id = tx.get("trans_num") or f"tx_{now}_{i}"
+        # Last one wins: a statement may not update the same row twice
+        rows[transaction_id] = (
+            transaction_id,
+            float(tx.get("amt", 0)),
+            str(tx.get("merchant", "Unknown"))[:255],
+            float(pred.get("probability", 0.0)),
+            int(pred.get("prediction", 0)),
+        )
+    return list(rows.values())
+
+
+def prepared_upsert(cur, rows: Sequence[Tuple[Any, ...]]) -> None:
+    """Upsert ``rows`` with the prepared statement, one round trip."""
+    params = [list(column) for column in zip(*rows)]
+    conn = cur.connection
+    try:
+        if conn in _prepared:
+            cur.execute(EXECUTE_UPSERT_SQL, params)
+        else:
+            # Sent together with the first EXECUTE. A failure closes the connection
+            # (pooled_connection), so no session keeps a stale fraud_upsert around.
+            cur.execute(PREPARE_UPSERT_SQL + EXECUTE_UPSERT_SQL, params)
+            _prepared.add(conn)
+    except Exception:
+        _prepared.discard(conn)
+        raise
+
+
+def copy_upsert(cur, rows: Sequence[Tuple[Any, ...]]) -> None:
+    """COPY ``rows`` into the stage table and merge them, for large batches."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.execute(STAGE_TABLE_SQL)
+    cur.copy_expert(COPY_STAGE_SQL, buffer)
+    cur.execute(MERGE_STAGE_SQL)
+
+
+def upsert_rows(
+    cur,
+    transactions: Sequence[Dict[str, Any]],
+    preds: Sequence[Dict[str, Any]],
+    method: str = DEFAULT_WRITE_METHOD,
+) -> int:
+    """One bulk upsert of scored transactions, returns the number of rows.
+
+    ``values`` sends a single multi-row INSERT (execute_values), ``prepared``
+    executes the prepared statement with the rows as arrays (direct
+    connections only, not behind a transaction-mode pooler), ``copy``
+    streams the rows with COPY then merges them; COPY pays off from a few
+    thousand rows. The schema must be migrated (see migrate()).
+    """
+    if method not in WRITE_METHODS:
+        raise ValueError(f"Unknown write method {method!r}, expected {WRITE_METHODS}")
+    rows = upsert_tuples(transactions, preds)
+    if not rows:
+        return 0
+    if method == "prepared":
+        prepared_upsert(cur, rows)
+    elif method == "copy":
+        copy_upsert(cur, rows)
+    else:
+        from psycopg2.extras import execute_values
+
+        execute_values(cur, UPSERT_SQL, rows, page_size=len(rows))
+    return len(rows)
+
+
+def log_alerts(
+    transactions: Sequence[Dict[str, Any]], preds: Sequence[Dict[str, Any]]
+) -> int:
+    """Simple alert threshold, returns the number of alerts."""
+    alerts = 0
+    for tx, pred in zip(transactions, preds):
+        if float(pred.get("probability", 0.0)) > ALERT_PROBABILITY:
+            alerts += 1
+            logging.warning(
+                "FRAUD ALERT: prob=%.6f, amount=$%s",
+                float(pred["probability"]),
+                tx.get("amt", 0),
+            )
+    return alerts
@@ -1,20 +1,73 @@
-from fastapi import FastAPI
-import joblib
-import pandas as pd
+import logging
+import sys
+import threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+# The Space bundles fraud_scoring/ next to app.py; a repo checkout has it one level up
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from fraud_scoring.metrics import REGISTRY, RequestTimer, route_paths
+from fraud_scoring.routes import scoring_router
+from fraud_scoring.schema import THRESHOLDS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = "fraud_model.pkl"
+
+# Scoring core shared with fraud_api, filled in by the background loader so
+# light endpoints (/, /thresholds, /health) answer while pandas/sklearn import
+service = None
+health_cache = None
+model_ready = threading.Event()
+model_error = None
+
+
+def load_model():
+    """Import the heavy dependencies and load the model"""
+    global service, health_cache, model_error
+    try:
+        from fraud_scoring.registry import ModelRegistry
+        from fraud_scoring.schema import HealthCache
+        from fraud_scoring.service import ScoringService
+        from fraud_scoring.warmup import warm_up
+        from fraud_scoring.weights import WEIGHTS_DIR
+
+        # Pipeline and/or compiled scorer (memory-mapped if WEIGHTS_DIR is set)
+        registry = ModelRegistry(MODEL_PATH, WEIGHTS_DIR)
+        # First requests would otherwise pay for lazy imports and page faults
+        warm_up(registry.current)
+        loaded_service = ScoringService(registry)
+        health_cache = HealthCache(loaded_service.health_payload())
+        service = loaded_service
+        model_ready.set()
+        logger.info("Model ready")
+    except Exception as e:
+        model_error = str(e)
+        logger.exception("Model loading failed")
+
+
+def start_model_loading() -> threading.Thread:
+    """Load the model in the background, the app starts serving right away"""
+    loader = threading.Thread(target=load_model, name="model-loader", daemon=True)
+    loader.start()
+    return loader
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_model_loading()
+    yield
+    if service is not None:
+        await service.batcher.stop()
 
-# Create FastAPI app
-app = FastAPI(title="Fraud Detection API", version="1.0.0")
-
-# Load the trained model
-model = joblib.load("fraud_model.pkl")
 
-# Available detection thresholds
-THRESHOLDS = {
-    "conservative": 0.5,  # Default ML threshold - fewer false alarms
-    "balanced": 0.1,  # Good balance - recommended
-    "sensitive": 0.01,  # Catches more fraud - more false alarms
-    "very_sensitive": 0.001,  # Maximum sensitivity
-}
+# Create FastAPI app
+app = FastAPI(title="Fraud Detection API", version="1.0.0", lifespan=lifespan)
 
 
 @app.get("/")
@@ -24,89 +77,41 @@ def root():
 
 
 @app.get("/health")
-def health_check():
+def health_check(if_none_match: Optional[str] = Header(None)):
     """Check if API and model are working"""
-    # Get expected columns from the model
-    preprocessor = model.named_steps["preproc"]
-    numeric_cols = list(preprocessor.named_transformers_["num"].feature_names_in_)
-    cat_cols = list(preprocessor.named_transformers_["cat"].feature_names_in_)
-
-    return {
-        "status": "healthy",
-        "model_loaded": True,
-        "expected_numeric": numeric_cols,
-        "expected_categorical": cat_cols,
-        "available_thresholds": list(THRESHOLDS.keys()),
-    }
-
-
-@app.post("/predict")
-def predict_fraud(request: dict):
-    """
-    Predict if a transaction is fraud
-
-    Expected format:
-    {
-        "data": {transaction_data},
-        "threshold": "balanced" (optional)
-    }
-    """
-    # Get transaction data
-    transaction_data = request.get("data", {})
-    threshold_name = request.get("threshold", "balanced")
-
-    # Validate threshold
-    if threshold_name not in THRESHOLDS:
-        threshold_name = "balanced"
-    threshold_value = THRESHOLDS[threshold_name]
-
-    # Prepare data for model
-    df_input = pd.DataFrame([transaction_data])
-
-    # Make prediction
-    probability = float(model.predict_proba(df_input)[0, 1])
-    prediction = int(probability >= threshold_value)
-
-    # Determine risk level
-    if probability >= 0.5:
-        risk_level = "CRITICAL"
-    elif probability >= 0.1:
-        risk_level = "HIGH"
-    elif probability >= 0.01:
-        risk_level = "MEDIUM"
-    else:
-        risk_level = "LOW"
-
-    # Return results
-    return {
-        "prediction": prediction,  # 0 = Normal, 1 = Fraud
-        "probability": probability,  # Fraud probability (0-1)
-        "threshold_used": threshold_value,  # Threshold used for decision
-        "risk_level": risk_level,  # Risk category
-        "details": {
-            "threshold_name": threshold_name,
-            "amount": transaction_data.get("amt", 0),
-            "merchant": transaction_data.get("merchant", "unknown"),
-            # Show what other thresholds would predict
-            "all_thresholds_result": {
-                name: int(probability >= thresh) for name, thresh in THRESHOLDS.items()
+    if not model_ready.is_set():
+        # Readiness flag: 503 until the background loader has finished
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "error" if model_error else "loading",
+                "model_loaded": False,
+                "error": model_error,
+                "available_thresholds": list(THRESHOLDS.keys()),
             },
-        },
-    }
-
-
-@app.get("/thresholds")
-def get_thresholds():
-    """Get available detection thresholds and their meanings"""
-    return {
-        "thresholds": THRESHOLDS,
-        "descriptions": {
-            "conservative": "Safe mode - Low false alarms, may miss some fraud",
-            "balanced": "Recommended - Good balance of detection and false alarms",
-            "sensitive": "High detection - Catches more fraud, more false alarms",
-            "very_sensitive": "Maximum detection - Many alerts, review all manually",
-        },
-    }
+        )
+
+    return health_cache.response(if_none_match)
+
+
+# /predict, /predict/batch, /predict/stream, /predict/columnar and GET /thresholds,
+# same handlers as fraud_api
+app.include_router(scoring_router(lambda: service))
+
+
+@app.get("/metrics")
+def metrics(request: Request, format: Optional[str] = None):
+    """Per-stage latency and prediction counters, Prometheus text when scraped"""
+    accept = request.headers.get("accept", "")
+    if format == "prometheus" or "text/plain" in accept or "openmetrics" in accept:
+        gauges = service.gauges() if service is not None else []
+        return PlainTextResponse(REGISTRY.render(gauges), media_type="text/plain; version=0.0.4")
+    stats = service.stats() if service is not None else {}
+    return {**stats, "instrumentation": REGISTRY.snapshot()}
+
+
+# End-to-end latency per endpoint, including the time to send the response
+app.add_middleware(RequestTimer, paths=route_paths(app.routes))
 
 
 # Run the API
@@ -0,0 +1,84 @@
+"""Cold-start benchmark for the Space API.
+
+Every run happens in a fresh interpreter so imports are really cold:
+- import_s: time to import app.py (light endpoints can answer after this)
+- load_s: time for the background loader to finish (readiness on /health)
+- first_prediction_ms / warm_prediction_ms: first and steady-state /predict
+
+Usage (from the directory holding fraud_model.pkl):
+    python benchmark_cold_start.py [runs]
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+def measure_once() -> dict:
+    """Time import, model load and the first predictions in this process"""
+    start = time.perf_counter()
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import app
+
+    imported = time.perf_counter()
+    app.start_model_loading().join()
+    loaded = time.perf_counter()
+    if not app.model_ready.is_set():
+        raise RuntimeError(f"model failed to load: {app.model_error}")
+
+    from fraud_scoring import codec
+
+    schema = app.health_cache.payload
+    row = {col: 0.0 for col in schema["expected_numeric"]}
+    row.update({col: "unknown" for col in schema["expected_categorical"]})
+    request = codec.PredictRequest(data=row, threshold="balanced")
+    # The same row every time, measure the model rather than the cache
+    app.service.cache.max_entries = 0
+    t0 = time.perf_counter()
+    app.service.score_batch([request])
+    first = time.perf_counter() - t0
+
+    warm = []
+    for _ in range(50):
+        t0 = time.perf_counter()
+        app.service.score_batch([request])
+        warm.append(time.perf_counter() - t0)
+
+    return {
+        "import_s": imported - start,
+        "load_s": loaded - imported,
+        "first_prediction_ms": first * 1000,
+        "warm_prediction_ms": statistics.median(warm) * 1000,
+        "compiled_scorer": app.service.registry.current.scorer is not None,
+    }
+
+
+def main(runs: int) -> None:
+    results = []
+    for i in range(runs):
+        out = subprocess.run(
+            [sys.executable, __file__, "--once"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        print(f"run {i + 1}/{runs}: {results[-1]}", file=sys.stderr)
+
+    summary = {
+        key: statistics.median(r[key] for r in results)
+        for key in ("import_s", "load_s", "first_prediction_ms", "warm_prediction_ms")
+    }
+    summary["runs"] = runs
+    summary["compiled_scorer"] = results[-1]["compiled_scorer"]
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    if "--once" in sys.argv:
+        print(json.dumps(measure_once()))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,121 @@
+"""p50/p99 latency of the binary protocol versus HTTP /predict.
+
+Start fraud_api with its binary front-end (one process, same model), then run the load test:
+    python fraud_binary_server.py --port 9000   # or --unix /tmp/fraud.sock
+    python benchmarks/bench_binary.py --http http://127.0.0.1:8000 --tcp 127.0.0.1:9000
+
+Each of the ``--concurrency`` workers holds one connection and sends
+``--requests`` unary calls back to back. The bidirectional stream runs
+once more over a single binary connection, for its throughput.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from fraud_scoring.wire import ScoringClient  # noqa: E402
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+async def run_workers(
+    make_call: Callable[[], Awaitable[Callable[[], Awaitable[None]]]], n: int, concurrency: int
+) -> Dict[str, float]:
+    """Latency of ``n`` calls per worker, ``concurrency`` workers in parallel"""
+    latencies: List[float] = []
+
+    async def worker() -> None:
+        call = await make_call()
+        for _ in range(min(n, 20)):  # warm-up
+            await call()
+        for _ in range(n):
+            t0 = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with httpx.AsyncClient(base_url=args.http, timeout=30) as client:
+        schema = (await client.get("/health")).json()
+    row = {col: 0.0 for col in schema["expected_numeric"]}
+    row.update({col: "unknown" for col in schema["expected_categorical"]})
+    body = json.dumps({"data": row, "threshold": "balanced"}).encode()
+    host, _, port = (args.tcp or "").rpartition(":")
+
+    async def connect() -> ScoringClient:
+        return await ScoringClient.connect(host, int(port) if port else None, path=args.unix)
+
+    async def http_call():
+        client = httpx.AsyncClient(base_url=args.http, timeout=30)
+
+        async def call():
+            response = await client.post(
+                "/predict", content=body, headers={"content-type": "application/json"}
+            )
+            response.raise_for_status()
+
+        return call
+
+    async def binary_call():
+        client = await connect()
+
+        async def call():
+            await client.predict(row, "balanced")
+
+        return call
+
+    results = {
+        "http": await run_workers(http_call, args.requests, args.concurrency),
+        "binary": await run_workers(binary_call, args.requests, args.concurrency),
+    }
+
+    n_stream = args.requests * args.concurrency
+
+    async def rows():
+        for _ in range(n_stream):
+            yield row, "balanced"
+
+    async with await connect() as client:
+        start = time.perf_counter()
+        async for _, result in client.stream(rows()):
+            if isinstance(result, Exception):
+                raise result
+        results["binary_stream"] = {
+            "requests": n_stream,
+            "rps": n_stream / (time.perf_counter() - start),
+        }
+
+    results["p50_speedup"] = results["http"]["p50_ms"] / results["binary"]["p50_ms"]
+    results["p99_speedup"] = results["http"]["p99_ms"] / results["binary"]["p99_ms"]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--http", default="http://127.0.0.1:8000")
+    parser.add_argument("--tcp", default="127.0.0.1:9000", help="host:port of the binary server")
+    parser.add_argument("--unix", help="Unix socket of the binary server (instead of --tcp)")
+    parser.add_argument("--requests", type=int, default=500, help="calls per worker")
+    parser.add_argument("--concurrency", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,89 @@
+"""Requests/second of the codec-based handlers versus the pydantic ones.
+
+The baseline app reproduces the previous /predict and /predict/batch
+handlers (pydantic request models, response_model validation, FastAPI's
+default JSON encoder) on top of the same scoring path as fraud_api, so the
+difference between the two columns is the JSON/validation layer only.
+
+Usage (from the directory holding fraud_model.pkl):
+    python benchmarks/bench_codec.py [n_requests] [concurrency]
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+import fraud_api  # noqa: E402
+from fraud_scoring.routes import PredictionRequest, PredictionResponse  # noqa: E402
+
+
+def baseline_app() -> FastAPI:
+    """Previous pydantic handlers, scoring through fraud_api's batcher"""
+    app = FastAPI(lifespan=fraud_api.lifespan)
+
+    @app.post("/predict", response_model=PredictionResponse)
+    async def predict(request: PredictionRequest):
+        probability = await fraud_api.service.batcher.submit(request.data)
+        return PredictionResponse(**fraud_api.service.prediction_fields(request, probability))
+
+    @app.post("/predict/batch")
+    def predict_batch(requests: list[PredictionRequest]):
+        results = fraud_api.service.score_batch(requests)
+        return {"predictions": [PredictionResponse(**r).model_dump() for r in results]}
+
+    return app
+
+
+async def requests_per_second(app, path: str, body: bytes, n: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    headers = {"content-type": "application/json"}
+    async with fraud_api.lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with semaphore:
+                    response = await client.post(path, content=body, headers=headers)
+                    response.raise_for_status()
+
+            await asyncio.gather(*[one() for _ in range(min(n, 50))])  # warm-up
+            start = time.perf_counter()
+            await asyncio.gather(*[one() for _ in range(n)])
+            return n / (time.perf_counter() - start)
+
+
+async def main(n: int, concurrency: int) -> None:
+    # Every request repeats the same rows, measure scoring rather than cache hits
+    fraud_api.service.cache.max_entries = 0
+    rows = fraud_api.registry.current.sample_rows(100)
+    single = json.dumps({"data": rows[0], "threshold": "balanced"}).encode()
+    batch = json.dumps([{"data": r} for r in rows]).encode()
+
+    results = {}
+    for name, app in (("pydantic", baseline_app()), ("codec", fraud_api.app)):
+        results[name] = {
+            "predict_rps": await requests_per_second(app, "/predict", single, n, concurrency),
+            "batch100_rps": await requests_per_second(
+                app, "/predict/batch", batch, max(n // 10, 10), concurrency
+            ),
+        }
+    results["speedup"] = {
+        key: results["codec"][key] / results["pydantic"][key] for key in results["codec"]
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 32,
+        )
+    )
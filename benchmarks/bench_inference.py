@@ -0,0 +1,286 @@
+"""Reproducible inference benchmark for the fraud scoring pipeline.
+
+Builds synthetic transactions with the model's schema (numeric fields
+jittered around the DAG defaults, categories drawn from the fitted encoder,
+unseen ``trans_num`` values as in production). Then it measures:
+
+- ``predict_proba`` of the sklearn pipeline and of the compiled scorer, for
+  batches of 1 to 100k rows;
+- end-to-end ``/predict`` and ``/predict/batch`` latency through an
+  in-process ASGI client, sequentially and under concurrency.
+
+Results are written to JSON together with the library versions and model
+version. Passing a previous result as ``--baseline`` prints the ratio of
+every timing and exits with status 1 if one got slower than ``--tolerance``.
+
+Usage (from the directory holding fraud_model.pkl):
+    python benchmarks/bench_inference.py --output bench.json
+    python benchmarks/bench_inference.py --quick --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+
+import fraud_api  # noqa: E402
+from fraud_scoring import batcher  # noqa: E402
+from fraud_scoring.schema import DEFAULTS  # noqa: E402
+
+SIZES = (1, 10, 100, 1_000, 10_000, 100_000)
+QUICK_SIZES = (1, 100, 10_000)
+MIN_SECONDS = 0.5  # keep repeating a measurement for at least this long
+MIN_REPEATS = 3
+MAX_REPEATS = 200
+
+# Relative spread of the numeric fields around their DEFAULTS value
+JITTER = {"amt": 1.0, "city_pop": 1.0, "unix_time": 1e-3, "lat": 0.2, "long": 0.2}
+
+
+def _categories(loaded) -> List[Sequence[str]]:
+    if loaded.scorer is not None:
+        return [list(c) for c in loaded.scorer.categories]
+    encoder = loaded.model.named_steps["preproc"].named_transformers_["cat"]
+    return [list(c) for c in encoder.categories_]
+
+
+def synthetic_transactions(loaded, n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """``n`` transactions with the model's columns, reproducible for a given seed"""
+    rng = np.random.default_rng(seed)
+    columns: Dict[str, List[Any]] = {}
+    for col in loaded.numeric_cols:
+        center = float(DEFAULTS.get(col, 0.0))
+        if col == "amt":
+            values = rng.lognormal(np.log(center) - 0.5, JITTER[col], n)
+        else:
+            spread = abs(center) * JITTER.get(col, 0.05) or 1.0
+            values = center + spread * rng.standard_normal(n)
+        columns[col] = values.tolist()
+    for col, cats in zip(loaded.categorical_cols, _categories(loaded)):
+        if col == "trans_num":
+            columns[col] = [f"{v:032x}" for v in rng.integers(0, 2**62, n)]
+        elif len(cats):
+            columns[col] = [cats[i] for i in rng.integers(0, len(cats), n)]
+        else:
+            columns[col] = [DEFAULTS.get(col, "unknown")] * n
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def _summary(samples_ms: List[float], rows: int = 1) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    median = statistics.median(ordered)
+    return {
+        "runs": len(ordered),
+        "min_ms": ordered[0],
+        "median_ms": median,
+        "p95_ms": float(np.percentile(ordered, 95)),
+        "rows_per_s": rows / (median / 1000) if median else float("inf"),
+    }
+
+
+def time_call(
+    fn: Callable[[], Any], rows: int, min_seconds: float = MIN_SECONDS
+) -> Dict[str, float]:
+    """Repeat ``fn`` until ``min_seconds`` have passed, milliseconds per call"""
+    fn()  # first call pays for lazy imports and page faults, not measured
+    samples: List[float] = []
+    deadline = time.perf_counter() + min_seconds
+    while len(samples) < MIN_REPEATS or (
+        time.perf_counter() < deadline and len(samples) < MAX_REPEATS
+    ):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return _summary(samples, rows)
+
+
+def bench_predict_proba(loaded, sizes: Sequence[int]) -> Dict[str, Dict[str, Any]]:
+    """sklearn pipeline (on a prebuilt DataFrame) and compiled scorer (on dicts)"""
+    import pandas as pd
+
+    rows = synthetic_transactions(loaded, max(sizes), seed=1)
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in sizes:
+        batch = rows[:size]
+        entry: Dict[str, Any] = {}
+        if loaded.model is not None:
+            frame = pd.DataFrame(batch)
+            entry["sklearn"] = time_call(lambda: loaded.model.predict_proba(frame), size)
+            entry["dataframe_build"] = time_call(lambda: pd.DataFrame(batch), size)
+        if loaded.scorer is not None:
+            entry["compiled"] = time_call(lambda: loaded.scorer.predict_many(batch), size)
+            if size == 1:
+                entry["compiled_one"] = time_call(lambda: loaded.scorer.predict_one(batch[0]), 1)
+        results[str(size)] = entry
+        timings = ", ".join(f"{name} {r['median_ms']:.3f} ms" for name, r in entry.items())
+        print(f"predict_proba {size:>7} rows: {timings}")
+    return results
+
+
+async def _load(client, path: str, bodies: List[bytes], concurrency: int) -> Dict[str, float]:
+    """Send every body once with at most ``concurrency`` requests in flight"""
+    headers = {"content-type": "application/json"}
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(body: bytes) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, content=body, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(body) for body in bodies])
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(bodies),
+        "concurrency": concurrency,
+        "requests_per_s": len(bodies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": max(latencies),
+    }
+
+
+async def bench_asgi(
+    n_requests: int, concurrency: Sequence[int], batch_size: int
+) -> Dict[str, Dict[str, Any]]:
+    """End-to-end latency of /predict and /predict/batch, in-process"""
+    # Distinct rows per request and no cache: measure scoring, not cache hits
+    fraud_api.service.cache.max_entries = 0
+    loaded = fraud_api.registry.current
+    n_batches = max(n_requests // 10, 10)
+    rows = synthetic_transactions(loaded, n_requests + n_batches * batch_size, seed=2)
+    single = [json.dumps({"data": row}).encode() for row in rows[:n_requests]]
+    batches = [
+        json.dumps([{"data": row} for row in rows[start: start + batch_size]]).encode()
+        for start in range(n_requests, len(rows), batch_size)
+    ]
+
+    results: Dict[str, Dict[str, Any]] = {"predict": {}, f"predict_batch_{batch_size}": {}}
+    transport = httpx.ASGITransport(app=fraud_api.app)
+    async with fraud_api.lifespan(fraud_api.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await _load(client, "/predict", single[:50], 8)  # warm-up
+            for level in concurrency:
+                for name, path, bodies in (
+                    ("predict", "/predict", single),
+                    (f"predict_batch_{batch_size}", "/predict/batch", batches),
+                ):
+                    result = await _load(client, path, bodies, level)
+                    results[name][f"c{level}"] = result
+                    print(
+                        f"{path:<15} c={level:<3} {result['requests_per_s']:8.1f} req/s  "
+                        f"p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms"
+                    )
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    import pandas as pd
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=Path(__file__).resolve().parent, check=True,
+        ).stdout.strip()  # fmt: skip
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    loaded = fraud_api.registry.current
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "model_version": loaded.version,
+        "compiled_scorer": loaded.scorer.kind if loaded.scorer is not None else None,
+        "batch_max_size": batcher.MAX_BATCH_SIZE,
+        "batch_max_wait_ms": batcher.MAX_WAIT_MS,
+    }
+
+
+def _timings(tree: Any, prefix: str = "") -> Dict[str, float]:
+    """Flatten a result tree to ``path -> ms`` for the medians and latency percentiles"""
+    out: Dict[str, float] = {}
+    if isinstance(tree, dict):
+        for key, value in tree.items():
+            path = f"{prefix}/{key}" if prefix else key
+            if key in ("median_ms", "p50_ms", "p99_ms") and isinstance(value, (int, float)):
+                out[path] = float(value)
+            else:
+                out.update(_timings(value, path))
+    return out
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Timings slower than ``baseline`` by more than ``tolerance``, printed as ratios"""
+    now, before = _timings(current["results"]), _timings(baseline["results"])
+    regressions = []
+    for path in sorted(now.keys() & before.keys()):
+        ratio = now[path] / before[path] if before[path] else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(path)
+            flag = "  <-- slower"
+        print(f"{path:<55} {before[path]:10.3f} -> {now[path]:10.3f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", help=f"batch sizes (default {SIZES})")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per ASGI run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--batch-size", type=int, default=100, help="rows per /predict/batch call")
+    parser.add_argument("--quick", action="store_true", help=f"sizes {QUICK_SIZES}, 200 requests")
+    parser.add_argument("--skip-asgi", action="store_true")
+    parser.add_argument("--output", default="bench_inference.json")
+    parser.add_argument("--baseline", help="previous JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    n_requests = 200 if args.quick else args.requests
+
+    report: Dict[str, Any] = {"environment": environment(), "results": {}}
+    report["results"]["predict_proba"] = bench_predict_proba(fraud_api.registry.current, sizes)
+    if not args.skip_asgi:
+        report["results"]["asgi"] = asyncio.run(
+            bench_asgi(n_requests, args.concurrency, args.batch_size)
+        )
+
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} timings slower than baseline by > {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Write-path benchmark for fraud_transactions (NeonDB / any Postgres).
+
+Measures, against a real database:
+
+- connection cost: a fresh ``psycopg2.connect`` (TLS handshake and auth on
+  Neon) versus checking a connection out of the pool;
+- rows/sec of the upsert methods for batches of 1 to 10k rows: ``row``
+  (one statement per transaction, the former DAG behaviour), ``ddl`` (the
+  schema DDL once more before a multi-row INSERT, as every write did before
+  versioned migrations), ``prepared`` (the prepared statement fed with
+  arrays), ``values`` (one multi-row INSERT) and ``copy`` (COPY into a temp
+  table, then merge).
+
+Every measurement runs in a transaction that is rolled back, so the table
+is left untouched.
+
+Usage:
+    python benchmarks/bench_store.py --db-uri "$NEON_DB_URI" --output bench_store.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "airflow" / "dags"))
+
+from fraud_pipeline import (  # noqa: E402
+    MIGRATIONS,
+    WRITE_METHODS,
+    connection_pool,
+    migrate,
+    upsert_rows,
+)
+
+SIZES = (1, 100, 1_000, 10_000)
+REPEATS = 5
+# The per-row baseline is slow over the network, cap its batch size
+ROW_MAX_SIZE = 1_000
+BASELINES = ("row", "ddl")
+
+
+def scored_batch(n: int) -> Dict[str, List[Dict[str, Any]]]:
+    """``n`` distinct transactions and their predictions"""
+    transactions = [
+        {"trans_num": uuid.uuid4().hex, "amt": 10.0 + i % 500, "merchant": f"bench_{i % 50}"}
+        for i in range(n)
+    ]
+    preds = [{"probability": (i % 100) / 100, "prediction": int(i % 100 >= 50)} for i in range(n)]
+    return {"transactions": transactions, "preds": preds}
+
+
+def _summary(samples_ms: List[float], rows: int) -> Dict[str, float]:
+    median = statistics.median(samples_ms)
+    return {
+        "runs": len(samples_ms),
+        "min_ms": min(samples_ms),
+        "median_ms": median,
+        "rows_per_s": rows / (median / 1000) if median else float("inf"),
+    }
+
+
+def bench_connect(db_uri: str, repeats: int) -> Dict[str, Dict[str, float]]:
+    """Fresh connection with a trivial query, versus the same through the pool"""
+    import psycopg2
+
+    def fresh() -> None:
+        conn = psycopg2.connect(db_uri)
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.close()
+
+    pool = connection_pool(db_uri)
+
+    def pooled() -> None:
+        conn = pool.getconn()
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        pool.putconn(conn)
+
+    results = {}
+    for name, fn in (("fresh", fresh), ("pooled", pooled)):
+        fn()  # warm-up, fills the pool
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = _summary(samples, 1)
+        print(f"connect {name:<7} median {results[name]['median_ms']:8.2f} ms")
+    return results
+
+
+def bench_upserts(
+    db_uri: str, sizes: Sequence[int], methods: Sequence[str], repeats: int
+) -> Dict[str, Dict[str, Any]]:
+    """Median time and rows/sec of each method and batch size, rolled back"""
+    pool = connection_pool(db_uri)
+    conn = pool.getconn()
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        with conn.cursor() as cur:
+            migrate(cur)  # inside the rolled back transaction as well
+            for size in sizes:
+                entry: Dict[str, Any] = {}
+                for method in methods:
+                    if method == "row" and size > ROW_MAX_SIZE:
+                        continue
+                    samples = []
+                    for _ in range(repeats):
+                        batch = scored_batch(size)  # fresh ids: measure inserts
+                        start = time.perf_counter()
+                        if method == "row":
+                            for tx, pred in zip(batch["transactions"], batch["preds"]):
+                                upsert_rows(cur, [tx], [pred], "values")
+                        elif method == "ddl":
+                            for statement in MIGRATIONS[0][2]:
+                                cur.execute(statement)
+                            upsert_rows(cur, batch["transactions"], batch["preds"], "values")
+                        else:
+                            upsert_rows(cur, batch["transactions"], batch["preds"], method)
+                        samples.append((time.perf_counter() - start) * 1000)
+                    entry[method] = _summary(samples, size)
+                results[str(size)] = entry
+                timings = ", ".join(
+                    f"{name} {r['median_ms']:.1f} ms ({r['rows_per_s']:.0f} rows/s)"
+                    for name, r in entry.items()
+                )
+                print(f"upsert {size:>6} rows: {timings}")
+    finally:
+        conn.rollback()
+        pool.putconn(conn)
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-uri", default=os.getenv("NEON_DB_URI"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument(
+        "--methods", nargs="+", choices=BASELINES + WRITE_METHODS,
+        default=[*BASELINES, *WRITE_METHODS],
+    )  # fmt: skip
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", default="bench_store.json")
+    args = parser.parse_args(argv)
+    if not args.db_uri:
+        parser.error("--db-uri (or NEON_DB_URI) is required")
+
+    report = {
+        "connect": bench_connect(args.db_uri, args.repeats),
+        "upsert": bench_upserts(args.db_uri, args.sizes, args.methods, args.repeats),
+    }
+    connection_pool(args.db_uri).closeall()
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
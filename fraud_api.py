@@ -1,124 +1,222 @@
 """A FastAPI application for fraud detection with configurable thresholds."""
 
-from fastapi import FastAPI
-import joblib
-import pandas as pd
+import asyncio
+import hmac
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Optional
 
-app = FastAPI()
+import fraud_binary_server
+from fraud_scoring.metrics import REGISTRY, RequestTimer, route_paths
+from fraud_scoring.profiler import SamplingProfiler
+from fraud_scoring.registry import WATCH_SECONDS, LoadedModel, ModelRegistry, ReloadInProgress
+from fraud_scoring.routes import scoring_router
+from fraud_scoring.schema import HealthCache
+from fraud_scoring.service import ScoringService
+from fraud_scoring.warmup import warm_up
+from fraud_scoring.weights import WEIGHTS_DIR
 
-# Load the pre-trained model
-model = joblib.load("fraud_model.pkl")
 
-THRESHOLDS = {
-    "conservative": 0.5,
-    "balanced": 0.1,
-    "sensitive": 0.01,
-    "very_sensitive": 0.001,
-}
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the model up, then run the micro-batcher (and the model file watcher)"""
+    # Startup only completes, and the server only accepts traffic, once warm
+    await run_in_threadpool(warm_up, registry.current)
+    await service.batcher.start()
+    watcher = asyncio.create_task(registry.watch()) if WATCH_SECONDS > 0 else None
+    binary = None
+    if BINARY_PORT or BINARY_SOCKET:
+        # Same process and scoring service as /predict, see fraud_binary_server
+        binary = await fraud_binary_server.start(
+            service, BINARY_HOST, int(BINARY_PORT or 0), BINARY_SOCKET
+        )
+    yield
+    if binary is not None:
+        binary.close()
+    if watcher is not None:
+        watcher.cancel()
+    await service.batcher.stop()
 
 
-class PredictionRequest(BaseModel):
-    """Request model for prediction endpoint"""
+logging.basicConfig(level=logging.INFO)
 
-    data: Dict[str, Any]
-    threshold: Optional[str] = "balanced"  # default
+app = FastAPI(lifespan=lifespan)
 
+MODEL_PATH = "fraud_model.pkl"
 
-class PredictionResponse(BaseModel):
-    """Response model for prediction endpoint"""
+# Binary front-end for intra-cluster callers, off unless a port or socket is set
+BINARY_HOST = os.getenv("FRAUD_BINARY_HOST", "0.0.0.0")
+BINARY_PORT = os.getenv("FRAUD_BINARY_PORT")
+BINARY_SOCKET = os.getenv("FRAUD_BINARY_SOCKET")
 
-    prediction: int
-    probability: float
-    threshold_used: float
-    risk_level: str
-    details: Dict[str, Any]
+# Required in the X-Admin-Token header of admin endpoints, which are off when unset
+ADMIN_TOKEN = os.getenv("FRAUD_ADMIN_TOKEN")
+
+# Load the pre-trained model (or memory-mapped weights), hot-swappable on reload
+registry = ModelRegistry(MODEL_PATH, WEIGHTS_DIR)
+
+# Model, cache, micro-batcher and thresholds, shared with the Space app
+service = ScoringService(registry)
+
+
+class ReloadRequest(BaseModel):
+    """Request model for the model reload endpoint (always the configured model)"""
+
+    force: bool = False
+
+
+class ThresholdRequest(BaseModel):
+    """Request model for registering a custom threshold"""
+
+    name: str
+    value: float
+    description: Optional[str] = None
+
+
+# Serialized once per model, clients revalidate with If-None-Match
+health_cache = HealthCache(service.health_payload())
+
+
+def _refresh_health(loaded: Optional[LoadedModel] = None) -> None:
+    """Rebuild the /health body after a model or threshold change"""
+    global health_cache
+    health_cache = HealthCache(service.health_payload())
+
+
+registry.on_swap(_refresh_health)
 
 
 @app.get("/health")
-def health():
+def health(if_none_match: Optional[str] = Header(None)):
     """Health check endpoint"""
-    # Extract feature names from the model's preprocessor
-    preprocessor = model.named_steps["preproc"]
-
-    numeric_cols = list(preprocessor.named_transformers_["num"].feature_names_in_)
-    cat_cols = list(preprocessor.named_transformers_["cat"].feature_names_in_)
-
-    return {
-        "status": "healthy",
-        "model_loaded": True,
-        "expected_numeric": numeric_cols,
-        "expected_categorical": cat_cols,
-        "available_thresholds": list(THRESHOLDS.keys()),
-    }
-
-
-@app.post("/predict", response_model=PredictionResponse)
-def predict_fraud(request: PredictionRequest):
-    """Predict fraud with configurable threshold"""
-
-    # Determine threshold
-    threshold_name = request.threshold
-    if threshold_name not in THRESHOLDS:
-        threshold_name = "balanced"
-    threshold_value = THRESHOLDS[threshold_name]
-
-    # Prepare input data
-    df_input = pd.DataFrame([request.data])
-
-    # Make prediction
-    probability = model.predict_proba(df_input)[0, 1]
-    prediction = int(probability >= threshold_value)
-
-    # Determine risk level
-    if probability >= 0.5:
-        risk_level = "CRITICAL"
-    elif probability >= 0.1:
-        risk_level = "HIGH"
-    elif probability >= 0.01:
-        risk_level = "MEDIUM"
-    else:
-        risk_level = "LOW"
-
-    return PredictionResponse(
-        prediction=prediction,
-        probability=float(probability),
-        threshold_used=threshold_value,
-        risk_level=risk_level,
-        details={
-            "threshold_name": threshold_name,
-            "amount": request.data.get("amt", 0),
-            "merchant": request.data.get("merchant", "unknown"),
-            "all_thresholds_result": {
-                name: int(probability >= thresh) for name, thresh in THRESHOLDS.items()
-            },
-        },
-    )
-
-
-@app.post("/predict/batch")
-def predict_batch(requests: list[PredictionRequest]):
-    """Batch prediction endpoint"""
-    results = []
-    for req in requests:
-        result = predict_fraud(req)
-        results.append(result.dict())
-    return {"predictions": results}
-
-
-@app.get("/thresholds")
-def get_thresholds():
-    """Get available thresholds and their meanings"""
-    return {
-        "thresholds": THRESHOLDS,
-        "descriptions": {
-            "conservative": "Default ML threshold (0.5) - Low false positives",
-            "balanced": "Balanced precision/recall - Recommended for production",
-            "sensitive": "High recall - Catches more fraud, more false positives",
-            "very_sensitive": "Very high recall - Investigation mode",
-        },
-    }
+    return health_cache.response(if_none_match)
+
+
+# /predict, /predict/batch, /predict/stream, /predict/columnar and GET /thresholds,
+# same handlers as the Space app
+app.include_router(scoring_router(lambda: service))
+
+
+# Off until switched on through /admin/profiler/start
+profiler = SamplingProfiler()
+
+
+def _gauges():
+    """Point-in-time serving values for the Prometheus output"""
+    return service.gauges() + [
+        ("fraud_profiler_running", "Sampling profiler switched on", int(profiler.running)),
+    ]
+
+
+@app.get("/metrics")
+def metrics(request: Request, format: Optional[str] = None):
+    """Serving metrics as JSON, or Prometheus text when scraped (Accept: text/plain)"""
+    accept = request.headers.get("accept", "")
+    if format == "prometheus" or "text/plain" in accept or "openmetrics" in accept:
+        return PlainTextResponse(
+            REGISTRY.render(_gauges()), media_type="text/plain; version=0.0.4"
+        )
+    return {**service.stats(), "instrumentation": REGISTRY.snapshot()}
+
+
+def _check_admin(token: Optional[str]) -> None:
+    """Fail closed: 404 without a configured token, 403 on a wrong one"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.post("/admin/profiler/start")
+def start_profiler(interval_ms: float = 5.0, x_admin_token: Optional[str] = Header(None)):
+    """Switch the sampling profiler on (stacks of every thread each interval)"""
+    _check_admin(x_admin_token)
+    profiler.start(interval_ms)
+    return profiler.report(top=0)
+
+
+@app.post("/admin/profiler/stop")
+def stop_profiler(top: int = 20, x_admin_token: Optional[str] = Header(None)):
+    """Switch the sampling profiler off and return its report"""
+    _check_admin(x_admin_token)
+    profiler.stop()
+    return profiler.report(top)
+
+
+@app.get("/admin/profiler")
+def profiler_report(
+    top: int = 20, collapsed: bool = False, x_admin_token: Optional[str] = Header(None)
+):
+    """Profile so far: top stacks, or collapsed stacks for flamegraph tools"""
+    _check_admin(x_admin_token)
+    if collapsed:
+        return PlainTextResponse(profiler.collapsed())
+    return profiler.report(top)
+
+
+@app.post("/admin/reload")
+async def reload_model(
+    request: Optional[ReloadRequest] = None, x_admin_token: Optional[str] = Header(None)
+):
+    """Load, smoke-test and hot-swap the model without dropping requests.
+
+    Only the worker process that receives the call swaps; with several
+    workers, rely on the file watcher (FRAUD_MODEL_WATCH_S) in each of them.
+    """
+    _check_admin(x_admin_token)
+    request = request or ReloadRequest()
+    try:
+        # Loading is blocking, the current model keeps serving meanwhile
+        return await run_in_threadpool(registry.reload, force=request.force)
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Reload failed, model unchanged: {e}")
+
+
+@app.post("/thresholds")
+def register_threshold(request: ThresholdRequest, x_admin_token: Optional[str] = Header(None)):
+    """Register (or update) a custom threshold usable by name in predictions.
+
+    Custom thresholds live in this worker process only and are lost on restart.
+    """
+    _check_admin(x_admin_token)
+    try:
+        service.register_threshold(request.name, request.value, request.description)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # available_thresholds changed, so does the /health body and its ETag
+    _refresh_health()
+    return {"name": request.name, "value": service.thresholds.thresholds[request.name]}
+
+
+@app.delete("/thresholds/{name}")
+def delete_threshold(name: str, x_admin_token: Optional[str] = Header(None)):
+    """Remove a custom threshold"""
+    _check_admin(x_admin_token)
+    try:
+        service.unregister_threshold(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown threshold: {name}")
+
+    _refresh_health()
+    return {"deleted": name}
+
+
+# End-to-end latency per endpoint, including the time to send the response
+app.add_middleware(
+    RequestTimer,
+    paths=[path for path in route_paths(app.routes) if not path.startswith("/admin")],
+)
 
 
 if __name__ == "__main__":
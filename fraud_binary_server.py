@@ -0,0 +1,117 @@
+"""Binary scoring front-end for intra-cluster callers, inside the FastAPI app.
+
+Speaks the length-prefixed protocol of ``fraud_scoring.wire`` over TCP or a
+Unix socket. ``fraud_api`` starts it in its lifespan when
+``FRAUD_BINARY_PORT`` or ``FRAUD_BINARY_SOCKET`` is set, so it runs in the
+same process and on the same scoring service as /predict. It shares the
+warmed-up model, hot reloads, prediction cache, micro-batcher and custom
+thresholds, and a reply carries exactly the /predict response. A
+connection can make unary calls, or stream many requests and receive the
+replies as they are scored.
+
+Usage (runs fraud_api on --http-port with the binary front-end enabled):
+    python fraud_binary_server.py --port 9000
+    python fraud_binary_server.py --unix /tmp/fraud.sock
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from typing import Optional, Tuple
+
+from fraud_scoring import codec, wire
+
+logger = logging.getLogger(__name__)
+
+# Unanswered requests per connection before the server stops reading it
+MAX_IN_FLIGHT = int(os.getenv("FRAUD_BINARY_MAX_IN_FLIGHT", "1024"))
+
+
+async def score(service, payload: bytes) -> Tuple[int, bytes]:
+    """Frame type and payload of the reply to one PREDICT frame"""
+    try:
+        request = codec.decode_request(payload)
+        fields = await service.predict(request)
+    except Exception as e:
+        return wire.ERROR, str(e).encode()
+    return wire.RESULT, codec.encode(codec.PredictResponse(**fields))
+
+
+async def handle_connection(
+    service, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    """Read frames, score them concurrently and reply in completion order"""
+    slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+    pending = set()
+
+    async def reply(request_id: int, payload: bytes) -> None:
+        try:
+            frame_type, body = await score(service, payload)
+            writer.write(wire.pack(frame_type, request_id, body))
+        finally:
+            slots.release()
+
+    try:
+        while True:
+            frame = await wire.read_frame(reader)
+            if frame is None:
+                break
+            frame_type, request_id, payload = frame
+            if frame_type != wire.PREDICT:
+                writer.write(wire.pack(wire.ERROR, request_id, b"Unsupported frame type"))
+                continue
+            # Backpressure: stop reading once too many requests are in flight
+            await slots.acquire()
+            task = asyncio.create_task(reply(request_id, payload))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            await writer.drain()
+        if pending:
+            await asyncio.gather(*pending)
+        await writer.drain()
+    except (wire.ProtocolError, ConnectionError) as e:
+        logger.warning("Closing binary connection: %s", e)
+    finally:
+        for task in pending:
+            task.cancel()
+        writer.close()
+
+
+async def start(
+    service, host: str = "0.0.0.0", port: Optional[int] = None, path: Optional[str] = None
+) -> asyncio.AbstractServer:
+    """Listen on ``path`` (Unix socket) or ``host:port``; the caller runs the batcher"""
+
+    async def handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await handle_connection(service, reader, writer)
+
+    if path:
+        server = await asyncio.start_unix_server(handler, path=path)
+    else:
+        # Each uvicorn worker binds the same port and gets its share of connections
+        server = await asyncio.start_server(handler, host, port, reuse_port=True)
+    logger.info("Binary scoring server on %s", path or f"{host}:{port}")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--unix", help="Unix socket path (instead of TCP)")
+    parser.add_argument("--http-port", type=int, default=8000)
+    args = parser.parse_args()
+
+    # Read by fraud_api's lifespan, which starts this front-end next to HTTP
+    os.environ["FRAUD_BINARY_HOST"] = args.host
+    if args.unix:
+        os.environ["FRAUD_BINARY_SOCKET"] = args.unix
+    else:
+        os.environ["FRAUD_BINARY_PORT"] = str(args.port)
+
+    import uvicorn
+
+    import fraud_api
+
+    uvicorn.run(fraud_api.app, host=args.host, port=args.http_port)
@@ -0,0 +1 @@
+"""Serving-side scoring engines for the fraud detection pipeline."""
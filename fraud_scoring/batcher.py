@@ -0,0 +1,135 @@
+"""Asyncio micro-batching in front of the scoring engine.
+
+Concurrent ``/predict`` calls are queued, coalesced for up to
+``max_batch_size`` rows or ``max_wait_ms`` milliseconds, scored with one
+vectorized call and resolved individually. This trades a couple of
+milliseconds of latency for far fewer model calls under load.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fraud_scoring.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = int(os.getenv("FRAUD_BATCH_MAX_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("FRAUD_BATCH_MAX_WAIT_MS", "2"))
+
+
+class MicroBatcher:
+    """Coalesces single-row requests into batched scoring calls"""
+
+    def __init__(
+        self,
+        score_many: Callable[[Sequence[Dict[str, Any]]], np.ndarray],
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_WAIT_MS,
+    ):
+        self.score_many = score_many
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.batch_sizes = Histogram([2**i for i in range(self.max_batch_size.bit_length())])
+        self.queue_depths = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024])
+        self.max_queue_depth = 0
+
+    async def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Score whatever is still queued, then stop the worker"""
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, row: Dict[str, Any]) -> float:
+        """Queue one row and wait for its fraud probability"""
+        if self._worker is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row, future))
+        depth = self._queue.qsize()
+        self.queue_depths.observe(depth)
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        return await future
+
+    async def _collect(self) -> List[Tuple[Dict[str, Any], asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score(self, rows: List[Dict[str, Any]]) -> List[Any]:
+        """Score a batch; if it fails, isolate the failing rows"""
+        try:
+            return list(self.score_many(rows))
+        except Exception:
+            results = []
+            for row in rows:
+                try:
+                    results.append(float(self.score_many([row])[0]))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.batch_sizes.observe(len(batch))
+            rows = [row for row, _ in batch]
+            try:
+                # Scoring is CPU work, keep the event loop free to accept requests
+                results = await loop.run_in_executor(None, self._score, rows)
+            except Exception as e:
+                logger.exception("Micro-batch scoring failed")
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():  # caller went away
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(float(result))
+            for _ in batch:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_depth_at_submit": self.queue_depths.snapshot(),
+        }
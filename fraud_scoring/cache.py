@@ -0,0 +1,124 @@
+"""LRU/TTL cache of fraud probabilities keyed by transaction fingerprint.
+
+DAG retries and repeated client fetches often score the exact same
+transaction again. The key is the ``trans_num`` plus a hash of the feature
+values, taken in the model's column order. A changed payload under the same
+``trans_num`` is therefore scored again. Probabilities are cached, not
+responses, because the threshold can differ between calls. The cache is
+cleared when the model version changes.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fraud_scoring import codec
+
+MAX_ENTRIES = int(os.getenv("FRAUD_CACHE_MAX_ENTRIES", "10000"))
+TTL_SECONDS = float(os.getenv("FRAUD_CACHE_TTL_S", "300"))
+
+
+class PredictionCache:
+    """Bounded, thread-safe probability cache"""
+
+    def __init__(
+        self,
+        columns: Sequence[str],
+        version: str,
+        max_entries: int = MAX_ENTRIES,
+        ttl_seconds: float = TTL_SECONDS,
+    ):
+        self.columns = list(columns)
+        self.version = version
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[bytes, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, row: Dict[str, Any]) -> Optional[bytes]:
+        """Fingerprint of a transaction, None if it can't be cached"""
+        if not self.enabled:
+            return None
+        try:
+            features = codec.encode([row.get(col) for col in self.columns])
+        except (TypeError, ValueError):
+            return None
+        digest = hashlib.blake2b(features, digest_size=16)
+        digest.update(str(row.get("trans_num", "")).encode())
+        # A probability from the previous model, stored after a swap, never hits
+        digest.update(self.version.encode())
+        return digest.digest()
+
+    def get(self, key: Optional[bytes]) -> Optional[float]:
+        if key is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                probability, expires = entry
+                if expires >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return probability
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Optional[bytes], probability: float) -> None:
+        if key is None:
+            return
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (float(probability), expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def lookup_many(
+        self, rows: Sequence[Dict[str, Any]]
+    ) -> Tuple[List[Optional[bytes]], List[Optional[float]]]:
+        """Keys and cached probabilities (None on a miss) of many rows"""
+        keys = [self.key(row) for row in rows]
+        return keys, [self.get(key) for key in keys]
+
+    def set_version(self, version: str, columns: Optional[Sequence[str]] = None) -> None:
+        """Drop every entry when the served model changes"""
+        with self._lock:
+            if version == self.version and columns is None:
+                return
+            self.version = version
+            if columns is not None:
+                self.columns = list(columns)
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "model_version": self.version,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
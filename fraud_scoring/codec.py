@@ -0,0 +1,139 @@
+"""Fast JSON codec for the prediction endpoints.
+
+At high QPS, pydantic validation plus FastAPI's default JSON encoding cost
+about as much as inference itself. Request and response shapes are declared
+once as msgspec structs, decoded straight from the request bytes and encoded
+straight to the response bytes. msgspec is optional: without it the codec
+falls back to orjson (or the standard library) with the same checks.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import Response
+
+try:
+    import msgspec
+except ImportError:  # optional dependency
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class DecodeError(ValueError):
+    """Request body is not valid for the endpoint"""
+
+
+if msgspec is not None:
+
+    class PredictRequest(msgspec.Struct):
+        data: Dict[str, Any]
+        threshold: Optional[str] = "balanced"
+
+    class PredictResponse(msgspec.Struct):
+        prediction: int
+        probability: float
+        threshold_used: float
+        risk_level: str
+        details: Dict[str, Any]
+
+    _request_decoder = msgspec.json.Decoder(PredictRequest)
+    _batch_decoder = msgspec.json.Decoder(List[PredictRequest])
+    _encoder = msgspec.json.Encoder()
+
+    def decode_request(body: bytes) -> PredictRequest:
+        try:
+            return _request_decoder.decode(body)
+        except msgspec.DecodeError as e:  # also covers ValidationError
+            raise DecodeError(str(e)) from e
+
+    def decode_batch(body: bytes) -> List[PredictRequest]:
+        try:
+            return _batch_decoder.decode(body)
+        except msgspec.DecodeError as e:  # also covers ValidationError
+            raise DecodeError(str(e)) from e
+
+    def encode(obj: Any) -> bytes:
+        return _encoder.encode(obj)
+
+    def decode_json(body: bytes) -> Any:
+        try:
+            return msgspec.json.decode(body)
+        except msgspec.DecodeError as e:
+            raise DecodeError(str(e)) from e
+
+else:
+
+    class _Struct:
+        """Stand-in for msgspec.Struct, encoded as an object of its slots"""
+
+        __slots__ = ()
+
+    class PredictRequest(_Struct):
+        __slots__ = ("data", "threshold")
+
+        def __init__(self, data: Dict[str, Any], threshold: Optional[str] = "balanced"):
+            self.data = data
+            self.threshold = threshold
+
+    class PredictResponse(_Struct):
+        __slots__ = ("prediction", "probability", "threshold_used", "risk_level", "details")
+
+        def __init__(self, prediction, probability, threshold_used, risk_level, details):
+            self.prediction = prediction
+            self.probability = probability
+            self.threshold_used = threshold_used
+            self.risk_level = risk_level
+            self.details = details
+
+    _loads = orjson.loads if orjson is not None else json.loads
+
+    def _to_request(obj: Any) -> PredictRequest:
+        if not isinstance(obj, dict) or not isinstance(obj.get("data"), dict):
+            raise DecodeError("Expected an object with a 'data' object")
+        threshold = obj.get("threshold", "balanced")
+        if threshold is not None and not isinstance(threshold, str):
+            raise DecodeError("'threshold' must be a string")
+        return PredictRequest(obj["data"], threshold)
+
+    def _parse(body: bytes) -> Any:
+        try:
+            return _loads(body)
+        except ValueError as e:
+            raise DecodeError(f"Invalid JSON: {e}") from e
+
+    def decode_request(body: bytes) -> PredictRequest:
+        return _to_request(_parse(body))
+
+    def decode_json(body: bytes) -> Any:
+        return _parse(body)
+
+    def decode_batch(body: bytes) -> List[PredictRequest]:
+        obj = _parse(body)
+        if not isinstance(obj, list):
+            raise DecodeError("Expected an array of prediction requests")
+        return [_to_request(item) for item in obj]
+
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, _Struct):
+            return {name: getattr(obj, name) for name in obj.__slots__}
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+    def encode(obj: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default)
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+class BytesJSONResponse(Response):
+    """JSON response whose body is already encoded (or encoded by the codec)"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return encode(content)
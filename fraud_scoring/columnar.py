@@ -0,0 +1,75 @@
+"""Columnar payloads for bulk scoring.
+
+The Jedha feed already returns pandas ``orient=split`` JSON (``columns`` +
+``data``), so a backlog of transactions can be pushed as one block instead of
+one JSON object per row. Accepted bodies:
+
+- ``application/json``: split JSON, possibly double-encoded like the feed
+- ``application/vnd.apache.arrow.stream``: Arrow IPC stream
+- ``application/vnd.apache.parquet`` / ``application/x-parquet``: Parquet file
+
+Arrow and Parquet need the optional ``pyarrow`` dependency.
+"""
+
+import io
+import json
+from typing import Any, Dict, List, Tuple
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET_TYPES = ("application/vnd.apache.parquet", "application/x-parquet")
+
+Columns = Dict[str, List[Any]]
+
+
+def media_type(content_type: str) -> str:
+    return content_type.split(";")[0].strip().lower() or "application/json"
+
+
+def is_supported(content_type: str) -> bool:
+    return media_type(content_type) in ("application/json", ARROW_STREAM) + PARQUET_TYPES
+
+
+def _from_split(body: bytes) -> Tuple[Columns, int]:
+    try:
+        obj = json.loads(body)
+        if isinstance(obj, str):  # the feed double-encodes its JSON
+            obj = json.loads(obj)
+        names, data = obj["columns"], obj["data"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"expected split-oriented JSON with 'columns' and 'data': {e}")
+    if any(len(row) != len(names) for row in data):
+        raise ValueError("every row in 'data' must have one value per column")
+    values = list(zip(*data)) if data else [()] * len(names)
+    return {name: list(col) for name, col in zip(names, values)}, len(data)
+
+
+def _from_table(table) -> Tuple[Columns, int]:
+    return {name: table.column(name).to_pylist() for name in table.column_names}, table.num_rows
+
+
+def read_columns(body: bytes, content_type: str) -> Tuple[Columns, int]:
+    """Decode a request body into (column name -> values, row count)"""
+    kind = media_type(content_type)
+    if kind == "application/json":
+        return _from_split(body)
+    if kind == ARROW_STREAM:
+        import pyarrow.ipc
+
+        return _from_table(pyarrow.ipc.open_stream(io.BytesIO(body)).read_all())
+    if kind in PARQUET_TYPES:
+        import pyarrow.parquet
+
+        return _from_table(pyarrow.parquet.read_table(io.BytesIO(body)))
+    raise ValueError(f"unsupported content type: {content_type}")
+
+
+def write_arrow(columns: Dict[str, Any]) -> bytes:
+    """Encode a columnar result as an Arrow IPC stream"""
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    table = pa.table(columns)
+    sink = io.BytesIO()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
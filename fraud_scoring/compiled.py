@@ -0,0 +1,284 @@
+"""NumPy-only scorer compiled from the fitted fraud detection pipeline.
+
+The training notebook exports a ``Pipeline`` made of a ``preproc``
+ColumnTransformer (StandardScaler on numerics, OneHotEncoder on categoricals)
+followed by a ``clf`` LogisticRegression or RandomForestClassifier. Running
+that pipeline on a one-row DataFrame is dominated by pandas construction and
+sklearn input validation, so the fitted parameters are read once here and
+plain dicts are scored with NumPy only.
+"""
+
+import logging
+import sys
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fraud_scoring.encoding import OneHotIndex
+from fraud_scoring.forest import ForestKernel
+from fraud_scoring.linear import LinearKernel
+from fraud_scoring.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+# Maximum allowed |compiled - predict_proba| before the compiled path is refused
+PARITY_TOLERANCE = 1e-9
+
+
+class _LinearEvaluator:
+    """Logistic regression parameters, scored by fraud_scoring.linear.LinearKernel"""
+
+    kind = "logistic_regression"
+
+    def __init__(self, coef: np.ndarray, intercept: float, n_numeric: int):
+        self.coef = coef
+        self.intercept = float(intercept)
+        self.n_numeric = n_numeric
+
+
+class CompiledScorer:
+    """Scores transaction dicts with the fitted pipeline parameters"""
+
+    def __init__(
+        self,
+        numeric_cols: Sequence[str],
+        mean: Optional[np.ndarray],
+        scale: np.ndarray,
+        categorical_cols: Sequence[str],
+        categories: Sequence[np.ndarray],
+        evaluator,
+        mapped: bool = False,
+    ):
+        self.numeric_cols = list(numeric_cols)
+        self.categorical_cols = list(categorical_cols)
+        self.mean = mean
+        self.scale = scale
+        self.categories = list(categories)
+        self.evaluator = evaluator
+
+        # Category blocks follow the numerics in the transformed feature matrix
+        self.one_hot = OneHotIndex(
+            self.categorical_cols,
+            self.categories,
+            start=len(self.numeric_cols),
+            mapped=mapped,
+        )
+        self.n_features = self.one_hot.stop
+
+        # Logistic regression skips encoding entirely, see fraud_scoring.linear
+        self.linear = None
+        if isinstance(evaluator, _LinearEvaluator):
+            self.linear = LinearKernel.from_parameters(
+                self.numeric_cols,
+                self.mean,
+                self.scale,
+                self.categorical_cols,
+                self.categories,
+                evaluator.coef,
+                evaluator.intercept,
+                mapped=mapped,
+            )
+
+    @property
+    def kind(self) -> str:
+        return self.evaluator.kind
+
+    def _scale(self, numeric: np.ndarray) -> np.ndarray:
+        if np.isnan(numeric).any():
+            raise ValueError("Input contains NaN")
+        if self.mean is not None:
+            numeric -= self.mean
+        numeric /= self.scale
+        return numeric
+
+    def encode(self, row: Dict[str, Any]) -> Tuple[np.ndarray, List[int]]:
+        """Return scaled numerics and the active one-hot feature indices"""
+        try:
+            numeric = np.array([row[col] for col in self.numeric_cols], dtype=np.float64)
+        except KeyError as e:
+            raise ValueError(f"columns are missing: {e}") from e
+        return self._scale(numeric), self.one_hot.active(row)
+
+    def encode_many(
+        self, rows: Sequence[Dict[str, Any]]
+    ) -> Tuple[np.ndarray, List[List[int]]]:
+        """Scaled numeric matrix and per-row active one-hot feature indices"""
+        try:
+            numeric = np.array(
+                [[row[col] for col in self.numeric_cols] for row in rows],
+                dtype=np.float64,
+            ).reshape(len(rows), len(self.numeric_cols))
+        except KeyError as e:
+            raise ValueError(f"columns are missing: {e}") from e
+        return self._scale(numeric), [self.one_hot.active(row) for row in rows]
+
+    def encode_columns(
+        self, columns: Mapping[str, Sequence], n_rows: int
+    ) -> Tuple[np.ndarray, List[List[int]]]:
+        """Columnar counterpart of encode_many (column name -> values)"""
+        try:
+            numeric = np.column_stack(
+                [np.asarray(columns[col], dtype=np.float64) for col in self.numeric_cols]
+            ).reshape(n_rows, len(self.numeric_cols))
+        except KeyError as e:
+            raise ValueError(f"columns are missing: {e}") from e
+        return self._scale(numeric), self.one_hot.active_columns(columns, n_rows)
+
+    def predict_one(self, row: Dict[str, Any]) -> float:
+        """Fraud probability for one transaction dict"""
+        start = time.perf_counter()
+        if self.linear is not None:
+            probability = self.linear.predict_one(row)
+            observe_stage("classifier", start)
+            return probability
+        numeric, active = self.encode(row)
+        classify = time.perf_counter()
+        observe_stage("preprocess", start)
+        probability = self.evaluator(numeric, active)
+        observe_stage("classifier", classify)
+        return probability
+
+    def predict_many(self, rows: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Fraud probabilities for a sequence of transaction dicts"""
+        if len(rows) == 1:
+            return np.array([self.predict_one(row) for row in rows], dtype=np.float64)
+        start = time.perf_counter()
+        if self.linear is not None:
+            probabilities = self.linear.predict_many(rows)
+            observe_stage("classifier", start)
+            return probabilities
+        encoded = self.encode_many(rows)
+        classify = time.perf_counter()
+        observe_stage("preprocess", start)
+        probabilities = self.evaluator.predict_batch(*encoded)
+        observe_stage("classifier", classify)
+        return probabilities
+
+    def predict_columns(self, columns: Mapping[str, Sequence], n_rows: int) -> np.ndarray:
+        """Fraud probabilities for a columnar block, without building row dicts"""
+        start = time.perf_counter()
+        if self.linear is not None:
+            probabilities = self.linear.predict_columns(columns, n_rows)
+            observe_stage("classifier", start)
+            return probabilities
+        encoded = self.encode_columns(columns, n_rows)
+        classify = time.perf_counter()
+        observe_stage("preprocess", start)
+        probabilities = self.evaluator.predict_batch(*encoded)
+        observe_stage("classifier", classify)
+        return probabilities
+
+    def synthetic_rows(self, n: int, seed: int = 0) -> List[Dict[str, Any]]:
+        """Rows drawn from the fitted parameters, including unseen categories"""
+        rng = np.random.default_rng(seed)
+        center = self.mean if self.mean is not None else np.zeros(len(self.numeric_cols))
+        rows = []
+        for _ in range(n):
+            numeric = center + self.scale * rng.standard_normal(len(self.numeric_cols))
+            row = {col: float(v) for col, v in zip(self.numeric_cols, numeric)}
+            for col, cats in zip(self.categorical_cols, self.categories):
+                if len(cats) == 0 or rng.random() < 0.1:
+                    row[col] = "__unseen__"
+                else:
+                    row[col] = cats[rng.integers(len(cats))]
+            rows.append(row)
+        return rows
+
+
+def _compile_classifier(clf, n_numeric: int):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    if len(clf.classes_) != 2:
+        raise ValueError("only binary classifiers can be compiled")
+
+    if isinstance(clf, LogisticRegression):
+        coef = np.asarray(clf.coef_[0], dtype=np.float64)
+        return _LinearEvaluator(coef, clf.intercept_[0], n_numeric)
+
+    if isinstance(clf, RandomForestClassifier):
+        return ForestKernel.from_estimators(clf.estimators_, n_numeric)
+
+    raise ValueError(f"unsupported classifier: {type(clf).__name__}")
+
+
+def compile_pipeline(model) -> CompiledScorer:
+    """Build a CompiledScorer from the fitted preproc/clf Pipeline"""
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    preprocessor = model.named_steps["preproc"]
+    fitted = [
+        (name, transformer)
+        for name, transformer, _ in preprocessor.transformers_
+        if not (name == "remainder" and transformer == "drop")
+    ]
+    if len(fitted) != 2:
+        raise ValueError("expected exactly one numeric and one categorical transformer")
+    (_, scaler), (_, encoder) = fitted
+    if not isinstance(scaler, StandardScaler) or not isinstance(encoder, OneHotEncoder):
+        raise ValueError("expected StandardScaler followed by OneHotEncoder")
+    if encoder.handle_unknown != "ignore" or encoder.drop_idx_ is not None:
+        raise ValueError("OneHotEncoder must use handle_unknown='ignore' and no drop")
+    if getattr(encoder, "_infrequent_enabled", False):
+        raise ValueError("infrequent categories are not supported")
+
+    numeric_cols = list(scaler.feature_names_in_)
+    n_numeric = len(numeric_cols)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_numeric)
+    mean = scaler.mean_ if scaler.with_mean else None
+
+    return CompiledScorer(
+        numeric_cols=numeric_cols,
+        mean=None if mean is None else np.asarray(mean, dtype=np.float64),
+        scale=np.asarray(scale, dtype=np.float64),
+        categorical_cols=list(encoder.feature_names_in_),
+        categories=[np.asarray(cats) for cats in encoder.categories_],
+        evaluator=_compile_classifier(model.named_steps["clf"], n_numeric),
+    )
+
+
+def parity_error(model, scorer: CompiledScorer, rows: Sequence[Dict[str, Any]]) -> float:
+    """Largest absolute difference between the scorer and predict_proba"""
+    import pandas as pd
+
+    expected = model.predict_proba(pd.DataFrame(list(rows)))[:, 1]
+    actual = scorer.predict_many(rows)
+    return float(np.max(np.abs(expected - actual)))
+
+
+def load_scorer(model, n_check: int = 64) -> Optional[CompiledScorer]:
+    """Compile the pipeline and check it against predict_proba.
+
+    Returns None when the pipeline cannot be compiled or disagrees with the
+    sklearn model, in which case callers keep using ``model.predict_proba``.
+    """
+    try:
+        scorer = compile_pipeline(model)
+        error = parity_error(model, scorer, scorer.synthetic_rows(n_check))
+    except Exception as e:
+        logger.warning("Compiled scorer unavailable (%s), using sklearn pipeline", e)
+        return None
+    if error > PARITY_TOLERANCE:
+        logger.warning("Compiled scorer parity error %.3g, using sklearn pipeline", error)
+        return None
+    logger.info("Compiled %s scorer (parity error %.3g)", scorer.kind, error)
+    return scorer
+
+
+if __name__ == "__main__":
+    # Parity check against the joblib model:
+    #   python -m fraud_scoring.compiled fraud_model.pkl [transactions.csv]
+    import joblib
+    import pandas as pd
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "fraud_model.pkl"
+    pipeline = joblib.load(model_path)
+    compiled = compile_pipeline(pipeline)
+    if len(sys.argv) > 2:
+        sample = pd.read_csv(sys.argv[2]).to_dict("records")
+    else:
+        sample = compiled.synthetic_rows(1000)
+    error = parity_error(pipeline, compiled, sample)
+    print(f"{compiled.kind}: max |compiled - predict_proba| = {error:.3g} on {len(sample)} rows")
+    sys.exit(0 if error <= PARITY_TOLERANCE else 1)
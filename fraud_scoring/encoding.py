@@ -0,0 +1,97 @@
+"""Hash-indexed replacement for OneHotEncoder.transform at serve time.
+
+The ``cat`` transformer is fitted on high-cardinality columns (merchant,
+street, first, last, job, city, trans_num, trans_date_trans_time...), so
+encoding a row by searching ``categories_`` gets slower as the vocabulary
+grows. The index below maps every category value straight to its output
+column once, when the model loads.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+class SortedLookup:
+    """Read-only ``get`` over a sorted (possibly memory-mapped) key array.
+
+    Used instead of a dict when the categories live in a shared memory map:
+    lookups are a binary search, but no per-process copy of the vocabulary is
+    built. Returns ``base + position`` or ``values[position]`` for a match.
+    """
+
+    def __init__(self, keys: np.ndarray, values: Optional[np.ndarray] = None, base: int = 0):
+        self.keys = keys
+        self.values = values
+        self.base = base
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if not isinstance(key, str):
+            return default
+        pos = int(np.searchsorted(self.keys, key))
+        if pos < len(self.keys) and self.keys[pos] == key:
+            return self.base + pos if self.values is None else float(self.values[pos])
+        return default
+
+
+class OneHotIndex:
+    """Per-column dict from category value to output column offset"""
+
+    def __init__(
+        self,
+        columns: Sequence[str],
+        categories: Sequence[np.ndarray],
+        start: int = 0,
+        mapped: bool = False,
+    ):
+        self.columns = list(columns)
+        self.tables: List[Any] = []
+        offset = start
+        for cats in categories:
+            if mapped:
+                # Keep the shared array, don't materialize a private dict
+                self.tables.append(SortedLookup(cats, base=offset))
+            else:
+                values = np.asarray(cats).tolist()
+                self.tables.append({value: offset + i for i, value in enumerate(values)})
+            offset += len(cats)
+        self.start = start
+        self.stop = offset
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def active(self, row: Dict[str, Any]) -> List[int]:
+        """Output column of every known category in the row.
+
+        Unknown values are skipped, matching handle_unknown="ignore" which
+        encodes them as all zeros.
+        """
+        indices = []
+        for col, table in zip(self.columns, self.tables):
+            try:
+                index = table.get(row[col])
+            except KeyError as e:
+                raise ValueError(f"columns are missing: {e}") from e
+            except TypeError:  # unhashable value, can't be a fitted category
+                continue
+            if index is not None:
+                indices.append(index)
+        return indices
+
+    def active_columns(self, columns: Mapping[str, Sequence], n_rows: int) -> List[List[int]]:
+        """Per-row active output columns for a columnar block"""
+        active: List[List[int]] = [[] for _ in range(n_rows)]
+        for col, table in zip(self.columns, self.tables):
+            try:
+                values = columns[col]
+            except KeyError as e:
+                raise ValueError(f"columns are missing: {e}") from e
+            for indices, value in zip(active, values):
+                try:
+                    index = table.get(value)
+                except TypeError:
+                    continue
+                if index is not None:
+                    indices.append(index)
+        return active
@@ -0,0 +1,171 @@
+"""Flattened, array-backed evaluator for the RandomForest pipeline.
+
+``RandomForestClassifier.predict_proba`` validates its input and dispatches
+every call through joblib, which dominates latency for the small batches the
+API sees. Here all estimators are exported once into contiguous NumPy arrays
+(feature, threshold, left, right, value). Batches are traversed level by
+level, one vectorized step per depth for every (row, tree) pair still on an
+internal node, and single rows walk the same arrays without any dispatch.
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Rows traversed together; small chunks keep the (rows x trees) state in cache
+CHUNK_SIZE = 64
+
+
+class ForestKernel:
+    """All trees of a fitted forest flattened into shared node arrays"""
+
+    kind = "random_forest"
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        used_features: np.ndarray,
+        n_numeric: int,
+        max_depth: int,
+        children: Optional[np.ndarray] = None,
+        mapped: bool = False,
+    ):
+        # Leaves point to themselves so extra traversal steps are no-ops
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        # children[2 * node + go_right] picks the next node with a single gather
+        if children is None:
+            children = np.empty(2 * len(left), dtype=np.intp)
+            children[0::2] = left
+            children[1::2] = right
+        self.children = children
+        # Transformed-matrix columns any split looks at; "feature" indexes into these
+        self.used_features = used_features
+        self.n_numeric = n_numeric
+        self.n_used_numeric = int(np.searchsorted(used_features, n_numeric))
+        self.width = max(len(used_features), 1)
+
+        # Python lists for the single-row walk, faster than array indexing.
+        # Memory-mapped kernels skip them: they would be a private copy per worker
+        self.mapped = mapped
+        self._lists = None
+
+    @classmethod
+    def from_estimators(cls, estimators: Sequence, n_numeric: int) -> "ForestKernel":
+        """Flatten the fitted DecisionTreeClassifier estimators"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            index = np.arange(offset, offset + n_nodes)
+            leaf = tree.children_left == -1
+            lefts.append(np.where(leaf, index, tree.children_left + offset))
+            rights.append(np.where(leaf, index, tree.children_right + offset))
+            features.append(np.where(leaf, -1, tree.feature))
+            thresholds.append(tree.threshold.astype(np.float64))
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :].astype(np.float64)
+            normalizer = proba.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(proba[:, 1] / normalizer)
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        feature = np.concatenate(features)
+        used_features = np.unique(feature[feature >= 0])
+        compact = np.where(feature >= 0, np.searchsorted(used_features, feature), 0)
+
+        return cls(
+            feature=compact.astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            used_features=used_features.astype(np.intp),
+            n_numeric=n_numeric,
+            max_depth=max_depth,
+        )
+
+    def _features(self, numeric: np.ndarray, active: Sequence[Sequence[int]]) -> np.ndarray:
+        """Dense float32 matrix over the used columns only"""
+        n = numeric.shape[0]
+        X = np.zeros((n, self.width), dtype=np.float32)
+        k = self.n_used_numeric
+        # sklearn trees compare float32 features against float64 thresholds
+        X[:, :k] = numeric[:, self.used_features[:k]]
+
+        lengths = [len(a) for a in active]
+        if sum(lengths):
+            rows = np.repeat(np.arange(n), lengths)
+            cols = np.concatenate([np.asarray(a, dtype=np.intp) for a in active])
+            pos = np.searchsorted(self.used_features, cols)
+            pos[pos == len(self.used_features)] = 0
+            hit = self.used_features[pos] == cols
+            X[rows[hit], pos[hit]] = 1.0
+        return X
+
+    def _traverse(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node of every (row, tree) pair, one vectorized step per level"""
+        n_trees = len(self.roots)
+        nodes = np.tile(self.roots, X.shape[0])
+        base = np.repeat(np.arange(X.shape[0]) * X.shape[1], n_trees)
+        flat = X.ravel()
+        for _ in range(self.max_depth):
+            go_right = flat[base + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_right]
+        return nodes
+
+    def predict_batch(
+        self, numeric: np.ndarray, active: Sequence[Sequence[int]]
+    ) -> np.ndarray:
+        """Fraud probabilities for scaled numerics and active one-hot columns"""
+        n_trees = len(self.roots)
+        out = np.empty(numeric.shape[0], dtype=np.float64)
+        for start in range(0, numeric.shape[0], CHUNK_SIZE):
+            stop = start + CHUNK_SIZE
+            X = self._features(numeric[start:stop], active[start:stop])
+            leaves = self._traverse(X)
+            out[start:stop] = self.value[leaves].reshape(-1, n_trees).sum(axis=1) / n_trees
+        return out
+
+    def __call__(self, numeric: np.ndarray, active: List[int]) -> float:
+        """Single-row walk over the flattened arrays, no joblib dispatch"""
+        if self.mapped:
+            return float(self.predict_batch(numeric.reshape(1, -1), [active])[0])
+        if self._lists is None:
+            self._lists = (
+                self.feature.tolist(),
+                self.threshold.tolist(),
+                self.left.tolist(),
+                self.right.tolist(),
+                self.value.tolist(),
+                self.roots.tolist(),
+            )
+        feature, threshold, left, right, value, roots = self._lists
+        values = self._features(numeric.reshape(1, -1), [active])[0].tolist()
+
+        total = 0.0
+        for node in roots:
+            while left[node] != node:
+                if values[feature[node]] <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            total += value[node]
+        return total / len(roots)
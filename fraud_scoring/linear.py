@@ -0,0 +1,136 @@
+"""Sparse-aware scoring kernel for the LogisticRegression pipeline.
+
+For the logistic regression branch of ``EDA_training.ipynb`` the decision
+function of a row is
+
+    intercept + sum_i coef_i * (x_i - mean_i) / scale_i + sum_c coef[one-hot(c)]
+
+so the StandardScaler can be folded into the numeric coefficients and every
+fitted category can be mapped directly to its coefficient. Scoring a row is
+then one multiply-add per numeric column, one dict lookup per categorical
+column and a sigmoid.
+"""
+
+import math
+from typing import Any, Dict, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from fraud_scoring.encoding import SortedLookup
+
+
+class LinearKernel:
+    """Folded logistic regression scorer working on plain dicts"""
+
+    def __init__(
+        self,
+        bias: float,
+        numeric_weights: Sequence[Tuple[str, float]],
+        category_weights: Sequence[Tuple[str, Dict[Any, float]]],
+    ):
+        self.bias = float(bias)
+        self.numeric_weights = list(numeric_weights)
+        self.category_weights = list(category_weights)
+        self.numeric_cols = [col for col, _ in self.numeric_weights]
+        self.weights = np.array([w for _, w in self.numeric_weights], dtype=np.float64)
+
+    @classmethod
+    def from_parameters(
+        cls,
+        numeric_cols: Sequence[str],
+        mean,
+        scale: np.ndarray,
+        categorical_cols: Sequence[str],
+        categories: Sequence[np.ndarray],
+        coef: np.ndarray,
+        intercept: float,
+        mapped: bool = False,
+    ) -> "LinearKernel":
+        """Fold the scaler and one-hot layout into per-column weights.
+
+        With ``mapped`` the category tables stay views on the (memory-mapped)
+        category and coefficient arrays instead of private dicts.
+        """
+        n_numeric = len(numeric_cols)
+        weights = np.asarray(coef[:n_numeric], dtype=np.float64) / scale
+        bias = float(intercept)
+        if mean is not None:
+            bias -= float(np.dot(weights, mean))
+
+        category_weights = []
+        offset = n_numeric
+        for col, cats in zip(categorical_cols, categories):
+            block = coef[offset : offset + len(cats)]
+            if mapped:
+                table = SortedLookup(cats, values=block)
+            else:
+                # Categories with a zero coefficient add nothing, same as unknowns
+                values = np.asarray(cats).tolist()
+                table = {value: w for value, w in zip(values, block.tolist()) if w != 0.0}
+            category_weights.append((col, table))
+            offset += len(cats)
+
+        return cls(bias, zip(numeric_cols, weights.tolist()), category_weights)
+
+    def decision_function(self, row: Dict[str, Any]) -> float:
+        try:
+            z = self.bias
+            for col, weight in self.numeric_weights:
+                z += weight * float(row[col])
+            for col, table in self.category_weights:
+                z += table.get(row[col], 0.0)
+        except KeyError as e:
+            raise ValueError(f"columns are missing: {e}") from e
+        if z != z:
+            raise ValueError("Input contains NaN")
+        return z
+
+    def predict_one(self, row: Dict[str, Any]) -> float:
+        """Fraud probability for one transaction dict"""
+        z = self.decision_function(row)
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+    def predict_many(self, rows: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Fraud probabilities for many rows, vectorized per column"""
+        n = len(rows)
+        try:
+            numeric = np.array(
+                [[row[col] for col in self.numeric_cols] for row in rows],
+                dtype=np.float64,
+            ).reshape(n, len(self.numeric_cols))
+            z = self.bias + numeric @ self.weights
+            for col, table in self.category_weights:
+                z += np.fromiter(
+                    (table.get(row[col], 0.0) for row in rows), dtype=np.float64, count=n
+                )
+        except KeyError as e:
+            raise ValueError(f"columns are missing: {e}") from e
+        return _probabilities(z)
+
+    def predict_columns(self, columns: Mapping[str, Sequence], n_rows: int) -> np.ndarray:
+        """Fraud probabilities for a columnar block (column name -> values)"""
+        try:
+            numeric = np.column_stack(
+                [np.asarray(columns[col], dtype=np.float64) for col in self.numeric_cols]
+            ).reshape(n_rows, len(self.numeric_cols))
+            z = self.bias + numeric @ self.weights
+            for col, table in self.category_weights:
+                z += np.fromiter(
+                    (table.get(value, 0.0) for value in columns[col]),
+                    dtype=np.float64,
+                    count=n_rows,
+                )
+        except KeyError as e:
+            raise ValueError(f"columns are missing: {e}") from e
+        return _probabilities(z)
+
+
+def _probabilities(z: np.ndarray) -> np.ndarray:
+    if np.isnan(z).any():
+        raise ValueError("Input contains NaN")
+    # 1 / (1 + exp(-z)) without overflow for large |z|
+    return np.exp(-np.logaddexp(0.0, -z))
+
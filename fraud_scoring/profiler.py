@@ -0,0 +1,98 @@
+"""Sampling profiler that can be switched on at runtime.
+
+A daemon thread wakes every ``interval_ms`` and records the stack of every
+other thread from ``sys._current_frames()``. Stacks are kept in collapsed
+form (``outer;inner;leaf``), the input format of flamegraph tools. There is
+no overhead while it is stopped, and only one stack walk per interval while
+it runs, so it can be turned on in production to find where tail latency
+goes.
+"""
+
+import collections
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+MAX_DEPTH = 64
+# Threads parked in these modules are idle (event loop select, pool workers)
+IDLE_MODULES = ("threading", "queue", "selectors", "concurrent.futures.thread")
+
+
+def _collapse(frame) -> Optional[str]:
+    """``module:function`` frames from outermost to leaf, None for idle threads"""
+    if frame.f_globals.get("__name__") in IDLE_MODULES:
+        return None
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Background stack sampler with collapsed-stack output"""
+
+    def __init__(self):
+        self.stacks: "collections.Counter[str]" = collections.Counter()
+        self.samples = 0
+        self.interval = 0.0
+        self.started_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: float = 5.0, reset: bool = True) -> None:
+        if self.running:
+            return
+        with self._lock:
+            if reset:
+                self.stacks.clear()
+                self.samples = 0
+        self.interval = max(0.5, interval_ms) / 1000.0
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            collapsed = [_collapse(f) for ident, f in frames.items() if ident != own]
+            with self._lock:
+                self.samples += 1
+                self.stacks.update(stack for stack in collapsed if stack is not None)
+
+    def collapsed(self) -> str:
+        """``stack count`` lines, ready for flamegraph.pl or speedscope"""
+        with self._lock:
+            return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def report(self, top: int = 20) -> Dict[str, Any]:
+        """Most frequent stacks and leaf functions so far"""
+        with self._lock:
+            stacks = self.stacks.most_common(top)
+            leaves: "collections.Counter[str]" = collections.Counter()
+            for stack, n in self.stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += n
+            samples = self.samples
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000.0,
+            "started_at": self.started_at,
+            "samples": samples,
+            "top_leaves": [{"frame": f, "count": n} for f, n in leaves.most_common(top)],
+            "top_stacks": [{"stack": s, "count": n} for s, n in stacks],
+        }
@@ -0,0 +1,336 @@
+"""Model registry with hot reload for the FastAPI serving process.
+
+The served model is held as one ``LoadedModel`` reference. A reload loads
+the candidate in the background and warms it up. It then runs a smoke test
+(compiled scorer versus sklearn parity, sane probabilities, single-row and
+batch latency) and only swaps the reference once that passes. Each request
+or micro-batch reads ``registry.current`` once, so in-flight work finishes
+on the model it started with, and nothing has to restart. Reloads come from
+the admin endpoint or from a watcher that polls the model file.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fraud_scoring.compiled import PARITY_TOLERANCE, CompiledScorer, load_scorer, parity_error
+from fraud_scoring.metrics import observe_stage, unobserved
+from fraud_scoring.schema import META_FILE, model_version
+from fraud_scoring.warmup import warm_up
+from fraud_scoring.weights import load_weights
+
+logger = logging.getLogger(__name__)
+
+SMOKE_ROWS = 256
+RELOAD_MAX_LATENCY_MS = float(os.getenv("FRAUD_RELOAD_MAX_LATENCY_MS", "50"))
+# Poll interval of the model file watcher, 0 disables it
+WATCH_SECONDS = float(os.getenv("FRAUD_MODEL_WATCH_S", "0"))
+# Forest batches above this many rows go through the sklearn pipeline when it is
+# loaded: the per-level gathers of ForestKernel lose to sklearn's tree traversal
+# on large batches. Unset, the crossover is measured at load (calibrate_forest)
+FOREST_KERNEL_MAX_ROWS = os.getenv("FRAUD_FOREST_KERNEL_MAX_ROWS")
+CALIBRATION_SIZES = (256, 1024, 2048)
+
+
+class SmokeTestError(RuntimeError):
+    """The candidate model failed its pre-swap checks"""
+
+
+class ReloadInProgress(RuntimeError):
+    """Another reload is already running"""
+
+
+class LoadedModel:
+    """One loaded model version: sklearn pipeline and/or compiled scorer"""
+
+    def __init__(
+        self,
+        version: str,
+        model,
+        scorer: Optional[CompiledScorer],
+        source: str,
+    ):
+        self.version = version
+        self.model = model
+        self.scorer = scorer
+        self.source = source
+        self.loaded_at = time.time()
+        self.warmup: Optional[Dict[str, Any]] = None
+        # Largest batch scored by a compiled forest while the pipeline is loaded
+        self.forest_max_rows = int(FOREST_KERNEL_MAX_ROWS or CALIBRATION_SIZES[0])
+
+        # Extract feature names from the compiled scorer or the model's preprocessor
+        if scorer is not None:
+            self.numeric_cols = list(scorer.numeric_cols)
+            self.categorical_cols = list(scorer.categorical_cols)
+        else:
+            preprocessor = model.named_steps["preproc"]
+            self.numeric_cols = list(preprocessor.named_transformers_["num"].feature_names_in_)
+            self.categorical_cols = list(preprocessor.named_transformers_["cat"].feature_names_in_)
+
+    @classmethod
+    @unobserved()  # parity check and calibration score synthetic rows
+    def load(cls, model_path: str, weights_dir: Optional[str] = None) -> "LoadedModel":
+        version = model_version(model_path, weights_dir)
+        if weights_dir:
+            # Memory-mapped weights shared by all workers, no private sklearn pipeline
+            return cls(version, None, load_weights(weights_dir), weights_dir)
+
+        import joblib
+
+        model = joblib.load(model_path)
+        # NumPy-only fast path (None if it can't be compiled)
+        loaded = cls(version, model, load_scorer(model), model_path)
+        if FOREST_KERNEL_MAX_ROWS is None:
+            calibrate_forest(loaded)
+        return loaded
+
+    def predict_one(self, row: Dict[str, Any]) -> float:
+        if self.scorer is not None:
+            return self.scorer.predict_one(row)
+        return float(self.predict_many([row])[0])
+
+    def use_scorer(self, n_rows: int) -> bool:
+        """Whether a batch of ``n_rows`` goes through the compiled scorer"""
+        if self.scorer is None:
+            return False
+        # Memory-mapped weights have no pipeline to fall back on
+        if self.model is None or self.scorer.kind != "random_forest":
+            return True
+        return n_rows <= self.forest_max_rows
+
+    def predict_many(self, rows: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Fraud probabilities for many transactions in one vectorized call"""
+        if self.use_scorer(len(rows)):
+            return self.scorer.predict_many(rows)
+        import pandas as pd
+
+        start = time.perf_counter()
+        frame = pd.DataFrame(list(rows))
+        observe_stage("dataframe", start)
+        return self._predict_frame(frame)
+
+    def predict_columns(self, columns: Mapping[str, Sequence], n_rows: int) -> np.ndarray:
+        """Fraud probabilities for a columnar block in one vectorized pass"""
+        if self.use_scorer(n_rows):
+            return self.scorer.predict_columns(columns, n_rows)
+        import pandas as pd
+
+        start = time.perf_counter()
+        frame = pd.DataFrame(columns)
+        observe_stage("dataframe", start)
+        return self._predict_frame(frame)
+
+    def _predict_frame(self, frame) -> np.ndarray:
+        """Pipeline.predict_proba, step by step so each stage is timed"""
+        start = time.perf_counter()
+        features = frame
+        for _, step in self.model.steps[:-1]:
+            features = step.transform(features)
+        classify = time.perf_counter()
+        observe_stage("preprocess", start)
+        probabilities = self.model.steps[-1][1].predict_proba(features)[:, 1]
+        observe_stage("classifier", classify)
+        return probabilities
+
+    def sample_rows(self, n: int) -> List[Dict[str, Any]]:
+        """Plausible rows for warm-up and smoke tests"""
+        if self.scorer is not None:
+            return self.scorer.synthetic_rows(n)
+        encoder = self.model.named_steps["preproc"].named_transformers_["cat"]
+        rng = np.random.default_rng(0)
+        rows = []
+        for _ in range(n):
+            row = {col: float(rng.standard_normal()) for col in self.numeric_cols}
+            for col, cats in zip(self.categorical_cols, encoder.categories_):
+                row[col] = cats[rng.integers(len(cats))]
+            rows.append(row)
+        return rows
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "compiled_scorer": self.scorer.kind if self.scorer is not None else None,
+            "forest_max_rows": self.forest_max_rows if self.scorer is not None else None,
+            "warmup": self.warmup,
+        }
+
+
+def calibrate_forest(loaded: LoadedModel, sizes: Sequence[int] = CALIBRATION_SIZES) -> int:
+    """Largest of ``sizes`` at which the compiled forest still beats the pipeline"""
+    if loaded.scorer is None or loaded.model is None or loaded.scorer.kind != "random_forest":
+        return loaded.forest_max_rows
+    import pandas as pd
+
+    def best_ms(fn, *args) -> float:
+        samples = []
+        for _ in range(2):
+            start = time.perf_counter()
+            fn(*args)
+            samples.append((time.perf_counter() - start) * 1000)
+        return min(samples)
+
+    rows = loaded.sample_rows(max(sizes))
+    limit = sizes[0]
+    for size in sizes:
+        batch = rows[:size]
+        kernel_ms = best_ms(loaded.scorer.predict_many, batch)
+        pipeline_ms = best_ms(lambda: loaded.model.predict_proba(pd.DataFrame(batch)))
+        if kernel_ms > pipeline_ms:
+            break
+        limit = size
+    loaded.forest_max_rows = limit
+    logger.info("Compiled forest scores batches of up to %d rows", limit)
+    return limit
+
+
+@unobserved()
+def smoke_test(
+    candidate: LoadedModel,
+    n_rows: int = SMOKE_ROWS,
+    max_latency_ms: float = RELOAD_MAX_LATENCY_MS,
+) -> Dict[str, Any]:
+    """Check a warmed-up candidate before it serves traffic"""
+    rows = candidate.sample_rows(n_rows)
+
+    start = time.perf_counter()
+    probabilities = np.asarray(candidate.predict_many(rows), dtype=np.float64)
+    batch_ms = (time.perf_counter() - start) * 1000
+    if probabilities.shape != (len(rows),) or not np.all(
+        (probabilities >= 0.0) & (probabilities <= 1.0)
+    ):
+        raise SmokeTestError("Probabilities missing, NaN or outside [0, 1]")
+
+    single = []
+    for row in rows[:32]:
+        t0 = time.perf_counter()
+        candidate.predict_one(row)
+        single.append((time.perf_counter() - t0) * 1000)
+    single_p99_ms = float(np.percentile(single, 99))
+    if single_p99_ms > max_latency_ms:
+        raise SmokeTestError(f"Single-row p99 {single_p99_ms:.1f} ms > {max_latency_ms:g} ms")
+
+    report = {
+        "rows": len(rows),
+        "batch_ms": batch_ms,
+        "single_p99_ms": single_p99_ms,
+        "parity_error": None,
+    }
+    if candidate.model is not None and candidate.scorer is not None:
+        error = parity_error(candidate.model, candidate.scorer, rows)
+        if error > PARITY_TOLERANCE:
+            raise SmokeTestError(f"Compiled scorer parity error {error:.3g}")
+        report["parity_error"] = error
+    return report
+
+
+class ModelRegistry:
+    """Currently served model, swapped atomically on reload"""
+
+    def __init__(self, model_path: str, weights_dir: Optional[str] = None):
+        self.model_path = model_path
+        self.weights_dir = weights_dir
+        self.current = LoadedModel.load(model_path, weights_dir)
+        self._fingerprint = self.fingerprint()
+        self._reload_lock = threading.Lock()
+        self._listeners: List[Callable[[LoadedModel], None]] = []
+
+        self.reloads = 0
+        self.failures = 0
+        self.last_reload: Optional[Dict[str, Any]] = None
+
+    def on_swap(self, callback: Callable[[LoadedModel], None]) -> None:
+        """Call ``callback(new_model)`` right after each swap"""
+        self._listeners.append(callback)
+
+    def fingerprint(
+        self, model_path: Optional[str] = None, weights_dir: Optional[str] = None
+    ) -> Optional[Tuple[int, int]]:
+        """mtime and size of the model file (or weights metadata)"""
+        model_path = model_path or self.model_path
+        weights_dir = weights_dir if weights_dir is not None else self.weights_dir
+        path = Path(weights_dir) / META_FILE if weights_dir else Path(model_path)
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(
+        self,
+        model_path: Optional[str] = None,
+        weights_dir: Optional[str] = None,
+        force: bool = False,
+    ) -> Dict[str, Any]:
+        """Load, smoke-test and swap in a model; the old one serves meanwhile"""
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgress("A reload is already running")
+        try:
+            model_path = model_path or self.model_path
+            weights_dir = weights_dir if weights_dir is not None else self.weights_dir
+            fingerprint = self.fingerprint(model_path, weights_dir)
+            previous = self.current
+            start = time.perf_counter()
+            try:
+                candidate = LoadedModel.load(model_path, weights_dir)
+                if candidate.version == previous.version and not force:
+                    report = {"status": "unchanged", "version": previous.version}
+                else:
+                    report = {
+                        "status": "swapped",
+                        "previous_version": previous.version,
+                        "version": candidate.version,
+                        "warmup_s": warm_up(candidate)["duration_s"],
+                        "smoke_test": smoke_test(candidate),
+                    }
+                    # Requests already holding the previous model finish on it
+                    self.current = candidate
+                    self.model_path, self.weights_dir = model_path, weights_dir
+                    self.reloads += 1
+                    for callback in self._listeners:
+                        callback(candidate)
+            except Exception as e:
+                self.failures += 1
+                self.last_reload = {"status": "failed", "error": str(e), "at": time.time()}
+                logger.exception("Model reload failed, still serving %s", previous.version)
+                raise
+            self._fingerprint = fingerprint
+            report["duration_s"] = time.perf_counter() - start
+            report["at"] = time.time()
+            self.last_reload = report
+            logger.info("Model reload: %s", report)
+            return report
+        finally:
+            self._reload_lock.release()
+
+    async def watch(self, interval: float = WATCH_SECONDS) -> None:
+        """Reload in the background whenever the model file changes"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            fingerprint = self.fingerprint()
+            if fingerprint is None or fingerprint == self._fingerprint:
+                continue
+            try:
+                await loop.run_in_executor(None, self.reload)
+            except ReloadInProgress:
+                pass
+            except Exception:
+                # Don't retry the same broken file until it changes again
+                self._fingerprint = fingerprint
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.current.info(),
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_reload": self.last_reload,
+        }
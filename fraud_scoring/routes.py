@@ -0,0 +1,180 @@
+"""Prediction endpoints shared by fraud_api and the Space app.
+
+``scoring_router`` serves /predict, /predict/batch, /predict/stream,
+/predict/columnar and /thresholds on top of a ``ScoringService``. Bodies are decoded and encoded with the fast codec,
+and both steps are timed. Predictions carry the model version in the
+X-Model-Version header. The router takes a callable that returns the
+service, or None while the model is still loading (503). This module only
+imports light dependencies, so an app can mount it before pandas, sklearn
+and numpy are imported.
+"""
+
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from fraud_scoring import codec, columnar
+from fraud_scoring.metrics import observe_stage
+from fraud_scoring.schema import MODEL_VERSION_HEADER, THRESHOLD_DESCRIPTIONS, THRESHOLDS
+from fraud_scoring.streaming import NDJSON, NDJSONStreamingResponse
+
+if TYPE_CHECKING:
+    from fraud_scoring.service import ScoringService
+
+
+class PredictionRequest(BaseModel):
+    """Request model for prediction endpoint"""
+
+    data: Dict[str, Any]
+    threshold: Optional[str] = "balanced"  # default
+
+
+class PredictionResponse(BaseModel):
+    """Response model for prediction endpoint"""
+
+    prediction: int
+    probability: float
+    threshold_used: float
+    risk_level: str
+    details: Dict[str, Any]
+
+
+def json_body(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """OpenAPI request body for endpoints that decode raw bytes with the codec"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": schema}},
+        }
+    }
+
+
+async def decode_body(request: Request, decoder):
+    """Decode the raw body with the fast codec, 422 on invalid payloads"""
+    body = await request.body()
+    start = time.perf_counter()
+    try:
+        return decoder(body)
+    except codec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        observe_stage("parse", start)
+
+
+def encode_response(obj: Any) -> codec.BytesJSONResponse:
+    """Serialize a response body with the fast codec"""
+    start = time.perf_counter()
+    body = codec.encode(obj)
+    observe_stage("serialize", start)
+    return codec.BytesJSONResponse(body)
+
+
+def versioned(response: codec.BytesJSONResponse, version: str) -> codec.BytesJSONResponse:
+    """Tag a prediction response with the model version that scored it"""
+    response.headers[MODEL_VERSION_HEADER] = version
+    return response
+
+
+def scoring_router(get_service: Callable[[], Optional["ScoringService"]]) -> APIRouter:
+    """Prediction endpoints and /thresholds for the service ``get_service`` returns"""
+    router = APIRouter()
+
+    def ready() -> "ScoringService":
+        service = get_service()
+        if service is None:
+            raise HTTPException(status_code=503, detail="Model is loading, retry shortly")
+        return service
+
+    @router.post(
+        "/predict",
+        response_model=PredictionResponse,
+        response_class=codec.BytesJSONResponse,
+        openapi_extra=json_body(PredictionRequest.model_json_schema()),
+    )
+    async def predict_fraud(raw: Request):
+        """Predict fraud with configurable threshold"""
+        service = ready()
+        request = await decode_body(raw, codec.decode_request)
+        version = service.registry.current.version
+        fields = await service.predict(request)
+        return versioned(encode_response(codec.PredictResponse(**fields)), version)
+
+    @router.post(
+        "/predict/batch",
+        response_class=codec.BytesJSONResponse,
+        openapi_extra=json_body({"type": "array", "items": PredictionRequest.model_json_schema()}),
+    )
+    async def predict_batch(raw: Request):
+        """Batch prediction endpoint"""
+        service = ready()
+        requests = await decode_body(raw, codec.decode_batch)
+        version = service.registry.current.version
+        results = await run_in_threadpool(service.score_batch, requests)
+        return versioned(encode_response({"predictions": results}), version)
+
+    @router.post(
+        "/predict/stream",
+        response_class=NDJSONStreamingResponse,
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {NDJSON: {"schema": PredictionRequest.model_json_schema()}},
+            }
+        },
+    )
+    async def predict_stream(raw: Request):
+        """Streaming NDJSON prediction: one request per line in, one result per line out"""
+        service = ready()
+        return NDJSONStreamingResponse(service.streamer.stream(raw.stream()))
+
+    @router.post("/predict/columnar")
+    async def predict_columnar(request: Request, threshold: Optional[str] = "balanced"):
+        """Bulk scoring of a columnar block: split JSON, Arrow IPC stream or Parquet"""
+        service = ready()
+        content_type = request.headers.get("content-type", "application/json")
+        if not columnar.is_supported(content_type):
+            raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+
+        body = await request.body()
+        start = time.perf_counter()
+        try:
+            columns, n_rows = columnar.read_columns(body, content_type)
+        except ImportError:
+            raise HTTPException(status_code=415, detail="pyarrow is required for Arrow/Parquet")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            observe_stage("parse", start)
+
+        version = service.registry.current.version
+        try:
+            # Missing columns, non-numeric values or an unknown threshold
+            result = await run_in_threadpool(service.score_columns, columns, n_rows, threshold)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if columnar.ARROW_STREAM in request.headers.get("accept", ""):
+            start = time.perf_counter()
+            # Only the per-row columns, the threshold fields are scalars
+            content = columnar.write_arrow(
+                {name: value for name, value in result.items() if isinstance(value, list)}
+            )
+            observe_stage("serialize", start)
+            response = Response(content=content, media_type=columnar.ARROW_STREAM)
+            response.headers[MODEL_VERSION_HEADER] = version
+            return response
+        return versioned(encode_response(result), version)
+
+    @router.get("/thresholds")
+    def get_thresholds():
+        """Get available thresholds and their meanings"""
+        service = get_service()
+        if service is None:
+            # Still loading: the defaults, custom thresholds need the service
+            return {"thresholds": THRESHOLDS, "descriptions": THRESHOLD_DESCRIPTIONS}
+        return service.describe_thresholds()
+
+    return router
@@ -0,0 +1,106 @@
+"""Precomputed /health schema served as cached bytes with an ETag.
+
+The DAG's ``prepare_payload`` task and ``client_realtime.get_expected_columns``
+call ``/health`` before every prediction. The expected columns only change
+with the model, so the response body is serialized once at model load and
+clients that send ``If-None-Match`` get a 304 instead of the full JSON.
+The default decision thresholds live here as well: they are part of that
+schema and must be listable before the model (and numpy) is loaded. So
+does ``DEFAULTS``, which the DAG steps (``airflow/dags/fraud_pipeline.py``)
+and the warm-up use to fill missing fields. This module only imports the
+standard library at import time, so the DAG can import it without FastAPI.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
+
+if TYPE_CHECKING:
+    from fastapi import Response
+
+META_FILE = "meta.json"
+
+# Set on prediction responses: clients caching the /health schema (the DAG) refresh
+# it when the version changes, without polling /health
+MODEL_VERSION_HEADER = "X-Model-Version"
+
+# Decision thresholds of both APIs, custom ones can be registered at runtime
+THRESHOLDS = {
+    "conservative": 0.5,  # Default ML threshold - fewer false alarms
+    "balanced": 0.1,  # Good balance - recommended
+    "sensitive": 0.01,  # Catches more fraud - more false alarms
+    "very_sensitive": 0.001,  # Maximum sensitivity
+}
+
+# Fallbacks for fields missing from a feed transaction, per model column
+DEFAULTS = {
+    "amt": 100.0,
+    "cc_num": 4000000000000002,
+    "zip": 12345,
+    "city_pop": 50000,
+    "lat": 40.7128,
+    "long": -74.0060,
+    "merch_lat": 40.7128,
+    "merch_long": -74.0060,
+    "first": "John",
+    "last": "Doe",
+    "gender": "M",
+    "street": "123 Main St",
+    "city": "Anytown",
+    "state": "NY",
+    "job": "Engineer",
+    "dob": "1990-01-01",
+    "merchant": "Generic Store",
+    "category": "misc_pos",
+    "trans_date_trans_time": "2020-06-15 12:00:00",
+    "unix_time": 1_592_222_400,
+}
+
+THRESHOLD_DESCRIPTIONS = {
+    "conservative": "Default ML threshold (0.5) - Low false positives",
+    "balanced": "Balanced precision/recall - Recommended for production",
+    "sensitive": "High recall - Catches more fraud, more false positives",
+    "very_sensitive": "Very high recall - Investigation mode",
+}
+
+
+def file_sha256(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_version(model_path: Union[str, Path], weights_dir: Optional[str] = None) -> str:
+    """Short content hash identifying the served model"""
+    if weights_dir:
+        meta = json.loads((Path(weights_dir) / META_FILE).read_text())
+        digest = meta.get("source_sha256") or file_sha256(Path(weights_dir) / META_FILE)
+    else:
+        digest = file_sha256(model_path)
+    return digest[:12]
+
+
+class HealthCache:
+    """Pre-serialized /health body and its ETag"""
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+        self.body = json.dumps(payload, separators=(",", ":")).encode()
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:16] + '"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags
+
+    def response(self, if_none_match: Optional[str] = None) -> "Response":
+        from fastapi import Response
+
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.matches(if_none_match):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
@@ -0,0 +1,235 @@
+"""Scoring core shared by fraud_api and the Space app.
+
+A ``ScoringService`` holds everything between a decoded request and its
+response fields:
+- the model registry, with hot reload
+- the prediction cache
+- the micro-batcher for single rows
+- the precomputed threshold table
+- the vectorized batch, columnar and NDJSON streaming paths
+
+Both APIs mount ``fraud_scoring.routes.scoring_router`` on top of it, so a
+scoring change reaches both deployments.
+"""
+
+import collections
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fraud_scoring import codec
+from fraud_scoring.batcher import MicroBatcher
+from fraud_scoring.cache import PredictionCache
+from fraud_scoring.metrics import count_predictions
+from fraud_scoring.registry import LoadedModel, ModelRegistry
+from fraud_scoring.schema import THRESHOLD_DESCRIPTIONS, THRESHOLDS
+from fraud_scoring.streaming import NDJSONStreamer
+from fraud_scoring.thresholds import ThresholdEngine
+
+
+class ScoringService:
+    """Model, cache, micro-batcher and thresholds behind the prediction endpoints"""
+
+    def __init__(self, registry: ModelRegistry, thresholds: Optional[Dict[str, float]] = None):
+        self.registry = registry
+        # Sorted once, gives every threshold decision with a single searchsorted
+        self.thresholds = ThresholdEngine(thresholds or THRESHOLDS)
+        self.descriptions = dict(THRESHOLD_DESCRIPTIONS)
+
+        # Repeated transactions (DAG retries, duplicate fetches) skip the model
+        loaded = registry.current
+        self.cache = PredictionCache(loaded.numeric_cols + loaded.categorical_cols, loaded.version)
+        # Coalesces concurrent /predict calls into batched model calls
+        self.batcher = MicroBatcher(self.predict_many)
+        # Replays of large transaction files, scored chunk by chunk with bounded memory
+        self.streamer = NDJSONStreamer(self.score_batch, codec.decode_request, codec.encode)
+        registry.on_swap(self._on_swap)
+
+    def _on_swap(self, loaded: LoadedModel) -> None:
+        self.cache.set_version(loaded.version, loaded.numeric_cols + loaded.categorical_cols)
+
+    def predict_many(self, rows: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Fraud probabilities for many transactions in one vectorized call"""
+        # One model reference per call, a concurrent reload never mixes versions
+        return self.registry.current.predict_many(rows)
+
+    def predict_cached(self, rows: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Like predict_many, only the rows missing from the cache reach the model"""
+        keys, cached = self.cache.lookup_many(rows)
+        missing = [i for i, probability in enumerate(cached) if probability is None]
+        if not missing:
+            return np.array(cached, dtype=np.float64)
+
+        probabilities = np.array([np.nan if p is None else p for p in cached], dtype=np.float64)
+        scored = self.predict_many([rows[i] for i in missing])
+        probabilities[missing] = scored
+        for i, probability in zip(missing, scored):
+            self.cache.put(keys[i], probability)
+        return probabilities
+
+    async def score_one(self, data: Dict[str, Any]) -> float:
+        """Fraud probability of one transaction, from the cache or the micro-batcher"""
+        key = self.cache.key(data)
+        probability = self.cache.get(key)
+        if probability is None:
+            # Queued and scored together with concurrent requests
+            probability = await self.batcher.submit(data)
+            self.cache.put(key, probability)
+        return probability
+
+    def prediction_fields(self, request, probability: float) -> Dict[str, Any]:
+        """Fields of the /predict response for one scored request"""
+        # Determine threshold
+        threshold_name, threshold_value = self.thresholds.resolve(request.threshold)
+        prediction = int(probability >= threshold_value)
+
+        # Risk level and all threshold decisions from the precomputed table
+        risk_level, all_thresholds_result = self.thresholds.decide_one(probability)
+
+        return {
+            "prediction": prediction,
+            "probability": float(probability),
+            "threshold_used": threshold_value,
+            "risk_level": risk_level,
+            "details": {
+                "threshold_name": threshold_name,
+                "amount": request.data.get("amt", 0),
+                "merchant": request.data.get("merchant", "unknown"),
+                "all_thresholds_result": all_thresholds_result,
+            },
+        }
+
+    async def predict(self, request: codec.PredictRequest) -> Dict[str, Any]:
+        """Score one request and build its /predict response fields"""
+        probability = await self.score_one(request.data)
+        fields = self.prediction_fields(request, probability)
+        count_predictions(
+            {(fields["details"]["threshold_name"], fields["prediction"]): 1},
+            {fields["risk_level"]: 1},
+        )
+        return fields
+
+    def score_batch(self, requests: List[codec.PredictRequest]) -> List[Dict[str, Any]]:
+        """Score many requests with a single vectorized model call"""
+        if not requests:
+            return []
+
+        # Per-row thresholds are still honored
+        resolved = [self.thresholds.resolve(req.threshold) for req in requests]
+        threshold_names = [name for name, _ in resolved]
+        threshold_values = np.array([value for _, value in resolved])
+
+        # One vectorized model call for the whole batch
+        probabilities = self.predict_cached([req.data for req in requests])
+
+        predictions = (probabilities >= threshold_values).astype(int)
+        risk_levels, all_thresholds = self.thresholds.decide(probabilities)
+        count_predictions(
+            collections.Counter(zip(threshold_names, predictions.tolist())),
+            collections.Counter(risk_levels),
+        )
+
+        results = []
+        for i, req in enumerate(requests):
+            results.append(
+                {
+                    "prediction": int(predictions[i]),
+                    "probability": float(probabilities[i]),
+                    "threshold_used": float(threshold_values[i]),
+                    "risk_level": risk_levels[i],
+                    "details": {
+                        "threshold_name": threshold_names[i],
+                        "amount": req.data.get("amt", 0),
+                        "merchant": req.data.get("merchant", "unknown"),
+                        "all_thresholds_result": all_thresholds[i],
+                    },
+                }
+            )
+        return results
+
+    def score_columns(
+        self, columns: Mapping[str, Sequence], n_rows: int, threshold: Optional[str]
+    ) -> Dict[str, Any]:
+        """Score a columnar block, ValueError for unknown thresholds or bad columns"""
+        # Bulk callers get an error rather than a silent fall back to the default
+        if threshold not in self.thresholds.thresholds:
+            raise ValueError(f"Unknown threshold: {threshold}")
+        threshold_name, threshold_value = self.thresholds.resolve(threshold)
+        if n_rows:
+            try:
+                probabilities = self.registry.current.predict_columns(columns, n_rows)
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"Invalid columns: {e}") from e
+        else:
+            probabilities = np.empty(0)
+
+        predictions = probabilities >= threshold_value
+        risk_levels = self.thresholds.risk_levels(probabilities)
+        n_flagged = int(predictions.sum())
+        levels, counts = np.unique(risk_levels, return_counts=True)
+        count_predictions(
+            {(threshold_name, 1): n_flagged, (threshold_name, 0): n_rows - n_flagged},
+            dict(zip(levels.tolist(), counts.tolist())),
+        )
+
+        result = {
+            "threshold_name": threshold_name,
+            "threshold_used": threshold_value,
+            "n_rows": n_rows,
+            "probability": probabilities.tolist(),
+            "prediction": predictions.astype(int).tolist(),
+            "risk_level": risk_levels.tolist(),
+        }
+        if "trans_num" in columns:
+            result["trans_num"] = [str(t) for t in columns["trans_num"]]
+        return result
+
+    def register_threshold(self, name: str, value: float, description: Optional[str] = None):
+        """Add or update a custom threshold, ValueError for built-in names or bad values"""
+        self.thresholds.register(name, value)
+        self.descriptions[name] = description or "Custom threshold"
+
+    def unregister_threshold(self, name: str) -> None:
+        """Remove a custom threshold, KeyError if unknown"""
+        self.thresholds.unregister(name)
+        self.descriptions.pop(name, None)
+
+    def describe_thresholds(self) -> Dict[str, Dict[str, Any]]:
+        thresholds = self.thresholds.thresholds
+        return {
+            "thresholds": thresholds,
+            "descriptions": {name: self.descriptions.get(name, "") for name in thresholds},
+        }
+
+    def health_payload(self) -> Dict[str, Any]:
+        """Schema and status reported by /health"""
+        loaded = self.registry.current
+        return {
+            "status": "healthy",
+            "model_loaded": True,
+            "model_version": loaded.version,
+            "expected_numeric": loaded.numeric_cols,
+            "expected_categorical": loaded.categorical_cols,
+            "available_thresholds": list(self.thresholds.thresholds),
+        }
+
+    def gauges(self) -> List[Tuple[str, str, float]]:
+        """Point-in-time scoring values for the Prometheus output"""
+        cache = self.cache.stats()
+        queue_depth = self.batcher.queue_depth
+        return [
+            ("fraud_batcher_queue_depth", "Rows waiting in the micro-batcher", queue_depth),
+            ("fraud_cache_hits", "Prediction cache hits", cache["hits"]),
+            ("fraud_cache_misses", "Prediction cache misses", cache["misses"]),
+            ("fraud_cache_size", "Prediction cache entries", cache["size"]),
+            ("fraud_model_reloads", "Successful model hot reloads", self.registry.reloads),
+            ("fraud_stream_active", "Active NDJSON streams", self.streamer.active_streams),
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.registry.stats(),
+            "batcher": self.batcher.stats(),
+            "cache": self.cache.stats(),
+            "stream": self.streamer.stats(),
+        }
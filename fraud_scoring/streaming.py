@@ -0,0 +1,184 @@
+"""Streaming NDJSON scoring with bounded memory and backpressure.
+
+A request body of newline-delimited prediction requests is read
+incrementally. Lines are decoded as they arrive, grouped into chunks of at
+most ``chunk_rows`` rows, and scored in a worker thread. The results are
+streamed back as NDJSON in input order. Between the body reader and the
+scorer sits a queue of at most ``max_pending`` chunks. When the model falls
+behind, the queue fills and the reader stops pulling the body, so the
+server's flow control slows the client down. Memory stays bounded by the
+queue size, whatever the length of the replay.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+
+from fraud_scoring.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "application/x-ndjson"
+CHUNK_ROWS = int(os.getenv("FRAUD_STREAM_CHUNK_ROWS", "256"))
+MAX_PENDING_CHUNKS = int(os.getenv("FRAUD_STREAM_MAX_PENDING", "4"))
+MAX_LINE_BYTES = int(os.getenv("FRAUD_STREAM_MAX_LINE_BYTES", str(1 << 20)))
+
+# Queue items: a chunk of (line number, decoded request or decode error)
+_Chunk = List[Tuple[int, Any]]
+
+
+class LineTooLong(ValueError):
+    """An NDJSON line exceeds the configured maximum size"""
+
+
+async def iter_lines(
+    body: AsyncIterator[bytes], max_line_bytes: int = MAX_LINE_BYTES
+) -> AsyncIterator[List[bytes]]:
+    """Complete lines from a byte stream, one list per received piece"""
+    buffer = bytearray()
+    async for piece in body:
+        buffer += piece
+        if b"\n" not in piece:
+            if len(buffer) > max_line_bytes:
+                raise LineTooLong(f"Line longer than {max_line_bytes} bytes")
+            continue
+        *lines, rest = bytes(buffer).split(b"\n")
+        buffer = bytearray(rest)
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(f"Line longer than {max_line_bytes} bytes")
+        yield lines
+    if buffer:
+        yield [bytes(buffer)]
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Streaming response that leaves the request body to the handler
+
+    Starlette's StreamingResponse polls ``receive`` for a disconnect while
+    streaming, which would swallow the body chunks the stream is still
+    reading. Here a disconnect surfaces through the body reader instead.
+    """
+
+    media_type = NDJSON
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+
+class NDJSONStreamer:
+    """Scores NDJSON request streams chunk by chunk"""
+
+    def __init__(
+        self,
+        score_chunk: Callable[[Sequence[Any]], List[Dict[str, Any]]],
+        decode: Callable[[bytes], Any],
+        encode: Callable[[Any], bytes],
+        chunk_rows: int = CHUNK_ROWS,
+        max_pending: int = MAX_PENDING_CHUNKS,
+    ):
+        self.score_chunk = score_chunk
+        self.decode = decode
+        self.encode = encode
+        self.chunk_rows = max(1, chunk_rows)
+        self.max_pending = max(1, max_pending)
+
+        self.active_streams = 0
+        self.rows = 0
+        self.errors = 0
+        self.backpressure_waits = 0
+        self.chunk_sizes = Histogram([2**i for i in range(self.chunk_rows.bit_length())])
+
+    def _score(self, chunk: _Chunk) -> bytes:
+        """Score one chunk; if it fails, isolate the failing rows"""
+        valid = [request for _, request in chunk if not isinstance(request, Exception)]
+        try:
+            results = iter(self.score_chunk(valid)) if valid else iter(())
+        except Exception:
+            results = iter([self._score_one(request) for request in valid])
+
+        out = []
+        for line_no, request in chunk:
+            result = request if isinstance(request, Exception) else next(results)
+            if isinstance(result, Exception):
+                self.errors += 1
+                result = {"line": line_no, "error": str(result)}
+            out.append(self.encode(result))
+        self.rows += len(chunk)
+        return b"\n".join(out) + b"\n"
+
+    def _score_one(self, request: Any) -> Any:
+        try:
+            return self.score_chunk([request])[0]
+        except Exception as e:
+            return e
+
+    async def _read(self, body: AsyncIterator[bytes], queue: asyncio.Queue) -> None:
+        """Decode the body into chunks, blocking while the queue is full"""
+
+        async def put(item: Any) -> None:
+            if queue.full():
+                self.backpressure_waits += 1
+            await queue.put(item)
+
+        line_no = 0
+        try:
+            async for lines in iter_lines(body):
+                chunk: _Chunk = []
+                for line in lines:
+                    line_no += 1
+                    if not line.strip():
+                        continue
+                    try:
+                        chunk.append((line_no, self.decode(line)))
+                    except ValueError as e:
+                        chunk.append((line_no, e))
+                    if len(chunk) >= self.chunk_rows:
+                        await put(chunk)
+                        chunk = []
+                # Score what has arrived instead of waiting for a full chunk
+                if chunk:
+                    await put(chunk)
+            await put(None)
+        except Exception as e:
+            await put(e)
+
+    async def stream(self, body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """NDJSON results for an NDJSON request body, in input order"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+        reader = asyncio.create_task(self._read(body, queue))
+        self.active_streams += 1
+        try:
+            while True:
+                chunk: Optional[Any] = await queue.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    logger.warning("NDJSON stream aborted: %s", chunk)
+                    self.errors += 1
+                    yield self.encode({"error": str(chunk)}) + b"\n"
+                    break
+                self.chunk_sizes.observe(len(chunk))
+                # Scoring is CPU work, keep the event loop free to read the body
+                yield await loop.run_in_executor(None, self._score, chunk)
+        finally:
+            self.active_streams -= 1
+            reader.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chunk_rows": self.chunk_rows,
+            "max_pending_chunks": self.max_pending,
+            "active_streams": self.active_streams,
+            "rows": self.rows,
+            "errors": self.errors,
+            "backpressure_waits": self.backpressure_waits,
+            "chunk_size": self.chunk_sizes.snapshot(),
+        }
@@ -0,0 +1,104 @@
+"""Threshold decisions and risk levels for whole probability vectors.
+
+The decision thresholds are sorted once. For a probability ``p``,
+``searchsorted`` gives ``k``, the number of thresholds at or below ``p``.
+That index is enough to know every threshold decision, because ``p`` passes
+exactly the ``k`` lowest thresholds. The ``all_thresholds_result`` dict for
+each possible ``k`` is therefore built ahead of time, and a response reuses
+one of those dicts instead of looping over the thresholds. Risk levels are
+found the same way, over the fixed risk bounds.
+"""
+
+import bisect
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Lower bounds of MEDIUM, HIGH and CRITICAL, same rules as the /predict if/elif chain
+RISK_BOUNDS = (0.01, 0.1, 0.5)
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH", "CRITICAL")
+
+
+class _Table(NamedTuple):
+    thresholds: Dict[str, float]  # insertion order, as listed by /thresholds
+    values: List[float]  # sorted
+    sorted_values: np.ndarray
+    decisions: Tuple[Dict[str, int], ...]  # decisions[k]: p passes the k lowest
+
+
+def _build_table(thresholds: Dict[str, float]) -> _Table:
+    values = sorted(thresholds.values())
+    decisions = tuple(
+        # p passes a threshold iff its value is one of the k lowest
+        {name: int(k > 0 and value <= values[k - 1]) for name, value in thresholds.items()}
+        for k in range(len(values) + 1)
+    )
+    return _Table(dict(thresholds), values, np.asarray(values, dtype=np.float64), decisions)
+
+
+class ThresholdEngine:
+    """Named decision thresholds, extendable at runtime"""
+
+    def __init__(self, thresholds: Dict[str, float], default: str = "balanced"):
+        self.builtin = frozenset(thresholds)
+        self.default = default
+        self._table = _build_table(thresholds)
+        self._lock = threading.Lock()
+
+    @property
+    def thresholds(self) -> Dict[str, float]:
+        return dict(self._table.thresholds)
+
+    def resolve(self, name: Optional[str]) -> Tuple[str, float]:
+        """Threshold name and value, unknown names fall back to the default"""
+        thresholds = self._table.thresholds
+        if name not in thresholds:
+            name = self.default
+        return name, thresholds[name]
+
+    def register(self, name: str, value: float) -> None:
+        """Add or update a custom threshold, built-in ones are fixed"""
+        if name in self.builtin:
+            raise ValueError(f"'{name}' is a built-in threshold")
+        if not 0.0 <= value <= 1.0:
+            raise ValueError("Threshold must be between 0 and 1")
+        with self._lock:
+            thresholds = dict(self._table.thresholds)
+            thresholds[name] = float(value)
+            # Readers keep using the previous table until this single assignment
+            self._table = _build_table(thresholds)
+
+    def unregister(self, name: str) -> None:
+        if name in self.builtin:
+            raise ValueError(f"'{name}' is a built-in threshold")
+        with self._lock:
+            thresholds = dict(self._table.thresholds)
+            if thresholds.pop(name, None) is None:
+                raise KeyError(name)
+            self._table = _build_table(thresholds)
+
+    def decide_one(self, probability: float) -> Tuple[str, Dict[str, int]]:
+        """Risk level and all threshold decisions for one probability"""
+        table = self._table
+        risk_level = RISK_LEVELS[bisect.bisect_right(RISK_BOUNDS, probability)]
+        return risk_level, table.decisions[bisect.bisect_right(table.values, probability)]
+
+    def decide(self, probabilities: np.ndarray) -> Tuple[List[str], List[Dict[str, int]]]:
+        """Risk levels and all threshold decisions for a probability vector
+
+        The decision dicts are shared between rows and must not be mutated.
+        """
+        table = self._table
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        risk = np.searchsorted(RISK_BOUNDS, probabilities, side="right")
+        passed = np.searchsorted(table.sorted_values, probabilities, side="right")
+        return (
+            [RISK_LEVELS[i] for i in risk.tolist()],
+            [table.decisions[k] for k in passed.tolist()],
+        )
+
+    def risk_levels(self, probabilities: np.ndarray) -> np.ndarray:
+        """Vectorized risk level of each probability"""
+        risk = np.searchsorted(RISK_BOUNDS, probabilities, side="right")
+        return np.asarray(RISK_LEVELS)[risk]
@@ -0,0 +1,138 @@
+"""Memory-mapped model weights shared by every API worker process.
+
+Each uvicorn worker that runs ``joblib.load("fraud_model.pkl")`` holds a
+private copy of the pipeline, which for a 100-tree forest is large. This
+module exports the compiled scorer's arrays (scaler parameters, one-hot
+category tables, coefficients or flattened tree nodes) as ``.npy`` files and
+loads them back with ``mmap_mode="r"``, so N workers share one copy in the
+page cache and start without unpickling sklearn objects.
+
+Export once next to the model, then point the API at the directory:
+
+    python -m fraud_scoring.weights fraud_model.pkl model_weights/
+    FRAUD_MODEL_WEIGHTS=model_weights uvicorn fraud_api:app --workers 4
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+from fraud_scoring.compiled import (
+    PARITY_TOLERANCE,
+    CompiledScorer,
+    _LinearEvaluator,
+    compile_pipeline,
+    parity_error,
+)
+from fraud_scoring.forest import ForestKernel
+from fraud_scoring.schema import META_FILE, file_sha256
+
+FORMAT_VERSION = 1
+
+# Directory of exported weights; when set the APIs serve from it
+WEIGHTS_DIR = os.getenv("FRAUD_MODEL_WEIGHTS")
+
+_FOREST_ARRAYS = (
+    "feature",
+    "threshold",
+    "left",
+    "right",
+    "value",
+    "roots",
+    "used_features",
+    "children",
+)
+
+
+def export_weights(
+    scorer: CompiledScorer, directory: Union[str, Path], source_sha256: str = ""
+) -> Path:
+    """Write the scorer's arrays as .npy files plus a meta.json"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "kind": scorer.kind,
+        "numeric_cols": scorer.numeric_cols,
+        "categorical_cols": scorer.categorical_cols,
+        "centered": scorer.mean is not None,
+        "source_sha256": source_sha256,
+    }
+    np.save(directory / "scale.npy", np.asarray(scorer.scale, dtype=np.float64))
+    if scorer.mean is not None:
+        np.save(directory / "mean.npy", np.asarray(scorer.mean, dtype=np.float64))
+
+    for i, cats in enumerate(scorer.categories):
+        values = np.asarray(cats).tolist()
+        if not all(isinstance(v, str) for v in values):
+            raise ValueError("only string categories can be memory-mapped")
+        # Fixed-width unicode keeps sklearn's sorted order and can be mapped
+        np.save(directory / f"categories_{i}.npy", np.array(values, dtype=str))
+
+    evaluator = scorer.evaluator
+    if isinstance(evaluator, _LinearEvaluator):
+        np.save(directory / "coef.npy", np.asarray(evaluator.coef, dtype=np.float64))
+        meta["intercept"] = evaluator.intercept
+    elif isinstance(evaluator, ForestKernel):
+        for name in _FOREST_ARRAYS:
+            np.save(directory / f"forest_{name}.npy", getattr(evaluator, name))
+        meta["max_depth"] = evaluator.max_depth
+    else:
+        raise ValueError(f"cannot export {scorer.kind} weights")
+
+    (directory / META_FILE).write_text(json.dumps(meta, indent=2))
+    return directory
+
+
+def load_weights(directory: Union[str, Path]) -> CompiledScorer:
+    """Build a CompiledScorer whose arrays are memory-mapped, read-only"""
+    directory = Path(directory)
+    meta = json.loads((directory / META_FILE).read_text())
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"unsupported weights format: {meta.get('format')}")
+
+    def mapped(name: str) -> np.ndarray:
+        # Plain ndarray view on the map: same shared pages, no memmap overhead
+        return np.asarray(np.load(directory / f"{name}.npy", mmap_mode="r"))
+
+    n_numeric = len(meta["numeric_cols"])
+    if meta["kind"] == _LinearEvaluator.kind:
+        evaluator = _LinearEvaluator(mapped("coef"), meta["intercept"], n_numeric)
+    elif meta["kind"] == ForestKernel.kind:
+        arrays = {name: mapped(f"forest_{name}") for name in _FOREST_ARRAYS}
+        evaluator = ForestKernel(
+            n_numeric=n_numeric, max_depth=meta["max_depth"], mapped=True, **arrays
+        )
+    else:
+        raise ValueError(f"unsupported model kind: {meta['kind']}")
+
+    return CompiledScorer(
+        numeric_cols=meta["numeric_cols"],
+        mean=mapped("mean") if meta["centered"] else None,
+        scale=mapped("scale"),
+        categorical_cols=meta["categorical_cols"],
+        categories=[
+            mapped(f"categories_{i}") for i in range(len(meta["categorical_cols"]))
+        ],
+        evaluator=evaluator,
+        mapped=True,
+    )
+
+
+if __name__ == "__main__":
+    import joblib
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "fraud_model.pkl"
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else "model_weights"
+
+    pipeline = joblib.load(model_path)
+    export_weights(compile_pipeline(pipeline), out_dir, file_sha256(model_path))
+    loaded = load_weights(out_dir)
+    error = parity_error(pipeline, loaded, loaded.synthetic_rows(1000))
+    print(f"Exported {loaded.kind} weights to {out_dir} (parity error {error:.3g})")
+    sys.exit(0 if error <= PARITY_TOLERANCE else 1)
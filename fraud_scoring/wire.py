@@ -0,0 +1,165 @@
+"""Length-prefixed binary protocol for intra-cluster scoring.
+
+Each frame is a 9-byte header followed by the payload::
+
+    !I  payload length
+    !B  frame type (PREDICT, RESULT, ERROR)
+    !I  request id, echoed in the reply
+
+Payloads are the /predict request and response bodies, encoded by the
+codec. A unary call sends one PREDICT frame and waits for its reply. A
+bidirectional stream keeps sending PREDICT frames on the same connection
+while replies come back, matched to their requests by id. There is no HTTP
+parsing, no headers and no per-call connection handling.
+"""
+
+import asyncio
+import itertools
+import struct
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Optional, Tuple
+
+from fraud_scoring import codec
+
+HEADER = struct.Struct("!IBI")
+MAX_FRAME_BYTES = 16 << 20
+
+PREDICT = 0x01
+RESULT = 0x81
+ERROR = 0xFF
+
+
+class ProtocolError(Exception):
+    """Malformed frame or unexpected frame type"""
+
+
+class RemoteError(Exception):
+    """The server could not score the request"""
+
+
+def pack(frame_type: int, request_id: int, payload: bytes) -> bytes:
+    return HEADER.pack(len(payload), frame_type, request_id) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Tuple[int, int, bytes]]:
+    """Next (frame type, request id, payload), None on a clean end of stream"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ProtocolError("Truncated frame header") from e
+        return None
+    length, frame_type, request_id = HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ProtocolError(f"Frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+    try:
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError as e:
+        raise ProtocolError("Truncated frame payload") from e
+    return frame_type, request_id, payload
+
+
+def _result(frame_type: int, payload: bytes) -> Dict[str, Any]:
+    if frame_type == ERROR:
+        raise RemoteError(payload.decode(errors="replace"))
+    if frame_type != RESULT:
+        raise ProtocolError(f"Unexpected frame type {frame_type:#x}")
+    return codec.decode_json(payload)
+
+
+class ScoringClient:
+    """Client for the binary scoring server over TCP or a Unix socket"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(
+        cls, host: Optional[str] = None, port: Optional[int] = None, path: Optional[str] = None
+    ) -> "ScoringClient":
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host or "127.0.0.1", port)
+        return cls(reader, writer)
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def __aenter__(self) -> "ScoringClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def predict(self, data: Dict[str, Any], threshold: str = "balanced") -> Dict[str, Any]:
+        """Unary call: score one transaction"""
+        payload = codec.encode(codec.PredictRequest(data=data, threshold=threshold))
+        async with self._lock:
+            request_id = next(self._ids)
+            self.writer.write(pack(PREDICT, request_id, payload))
+            await self.writer.drain()
+            frame = await read_frame(self.reader)
+        if frame is None:
+            raise ProtocolError("Connection closed by the server")
+        frame_type, reply_id, payload = frame
+        if reply_id != request_id:
+            raise ProtocolError(f"Reply for request {reply_id}, expected {request_id}")
+        return _result(frame_type, payload)
+
+    async def stream(
+        self, requests: AsyncIterable[Tuple[Dict[str, Any], str]]
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Bidirectional stream: (request index, result) pairs as they complete
+
+        Requests are sent while replies are read, so the server can batch the
+        in-flight ones together. A failed request yields its RemoteError.
+        """
+        async with self._lock:
+            base = next(self._ids)
+            sent = 0
+            done_sending = asyncio.Event()
+            progress = asyncio.Event()
+
+            async def send() -> None:
+                nonlocal sent
+                try:
+                    async for data, threshold in requests:
+                        payload = codec.encode(codec.PredictRequest(data=data, threshold=threshold))
+                        self.writer.write(pack(PREDICT, base + sent, payload))
+                        sent += 1
+                        progress.set()
+                        await self.writer.drain()
+                finally:
+                    done_sending.set()
+                    progress.set()
+
+            sender = asyncio.create_task(send())
+            received = 0
+            try:
+                while True:
+                    if received == sent:
+                        if done_sending.is_set():
+                            break
+                        # Nothing in flight, wait for the next request to go out
+                        progress.clear()
+                        await progress.wait()
+                        continue
+                    frame = await read_frame(self.reader)
+                    if frame is None:
+                        raise ProtocolError("Connection closed by the server")
+                    frame_type, reply_id, payload = frame
+                    received += 1
+                    try:
+                        result = _result(frame_type, payload)
+                    except RemoteError as e:
+                        result = e
+                    yield reply_id - base, result
+                await sender
+            finally:
+                sender.cancel()
+                # Keep request ids unique across calls on this connection
+                self._ids = itertools.count(base + sent + 1)
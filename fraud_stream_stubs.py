@@ -0,0 +1,140 @@
+"""Offline stand-ins for the Jedha feed and the scoring API.
+
+``make_feed_app`` serves /current-transactions in the Jedha format (pandas
+split JSON, encoded twice) with synthetic transactions, and repeats some of
+them across polls like the real feed does. ``make_model_app`` serves /health
+and /predict/batch with a cheap deterministic score. Together they let the
+streaming worker and the DAG steps run end to end without network access
+or a model file.
+
+Usage:
+    uvicorn fraud_stream_stubs:feed_app --port 8001
+    uvicorn fraud_stream_stubs:model_app --port 8002
+"""
+
+import asyncio
+import collections
+import json
+import math
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+# Columns of the real feed, in its order
+FEED_COLUMNS = [
+    "cc_num", "merchant", "category", "amt", "first", "last", "gender", "street", "city",
+    "state", "zip", "lat", "long", "city_pop", "job", "dob", "trans_num", "merch_lat",
+    "merch_long", "is_fraud", "current_time",
+]  # fmt: skip
+
+EXPECTED_NUMERIC = [
+    "cc_num", "amt", "zip", "lat", "long", "city_pop", "unix_time", "merch_lat", "merch_long",
+]  # fmt: skip
+EXPECTED_CATEGORICAL = [
+    "trans_date_trans_time", "merchant", "category", "first", "last", "gender", "street",
+    "city", "state", "job", "dob", "trans_num",
+]  # fmt: skip
+
+CATEGORIES = ["grocery_pos", "gas_transport", "shopping_net", "misc_pos", "entertainment"]
+STUB_THRESHOLD = 0.5
+
+
+def synthetic_transaction(rng: random.Random) -> List[Any]:
+    """One feed row, amounts log-normal around $70 with a long tail"""
+    lat, lon = rng.uniform(30, 45), rng.uniform(-120, -75)
+    return [
+        rng.randrange(10**15, 10**16),
+        f"fraud_Stub Merchant {rng.randrange(100)}",
+        rng.choice(CATEGORIES),
+        round(rng.lognormvariate(4.2, 1.2), 2),
+        "Jane",
+        "Doe",
+        rng.choice("FM"),
+        "1 Stub Street",
+        "Stubville",
+        "NY",
+        rng.randrange(10000, 99999),
+        lat,
+        lon,
+        rng.randrange(100, 2_000_000),
+        "Engineer",
+        "1980-01-01",
+        uuid.UUID(int=rng.getrandbits(128)).hex,
+        lat + rng.uniform(-1, 1),
+        lon + rng.uniform(-1, 1),
+        0,
+        int(time.time() * 1000),
+    ]
+
+
+def make_feed_app(rows_per_poll: int = 1, repeat_ratio: float = 0.3, seed: int = 0) -> FastAPI:
+    """Jedha-like feed, ``repeat_ratio`` of each response was already served before"""
+    app = FastAPI(title="Stub transaction feed")
+    rng = random.Random(seed)
+    recent = collections.deque(maxlen=1000)
+
+    @app.get("/current-transactions")
+    def current_transactions():
+        rows = []
+        for _ in range(rows_per_poll):
+            if recent and rng.random() < repeat_ratio:
+                rows.append(rng.choice(recent))
+            else:
+                row = synthetic_transaction(rng)
+                recent.append(row)
+                rows.append(row)
+        split = {"columns": FEED_COLUMNS, "index": list(range(len(rows))), "data": rows}
+        # The real feed returns the split JSON as a JSON string
+        return Response(json.dumps(json.dumps(split)), media_type="application/json")
+
+    return app
+
+
+def stub_probability(data: Dict[str, Any]) -> float:
+    """Deterministic score rising steeply with the amount, 0.5 at $500"""
+    amount = float(data.get("amt") or 0.0)
+    return 1.0 / (1.0 + math.exp(-(amount - 500.0) / 30.0))
+
+
+def make_model_app(latency_ms: float = 0.0) -> FastAPI:
+    """/health and /predict/batch of the scoring API, ``latency_ms`` per batch call"""
+    app = FastAPI(title="Stub scoring API")
+
+    @app.get("/health")
+    def health():
+        return {
+            "status": "healthy",
+            "model_loaded": True,
+            "model_version": "stub",
+            "expected_numeric": EXPECTED_NUMERIC,
+            "expected_categorical": EXPECTED_CATEGORICAL,
+        }
+
+    @app.post("/predict/batch")
+    async def predict_batch(request: Request):
+        body = await request.json()
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        predictions = []
+        for item in body:
+            probability = stub_probability(item["data"])
+            predictions.append(
+                {
+                    "prediction": int(probability >= STUB_THRESHOLD),
+                    "probability": probability,
+                    "threshold_used": STUB_THRESHOLD,
+                    "risk_level": "HIGH" if probability >= STUB_THRESHOLD else "LOW",
+                    "details": {"threshold_name": "stub"},
+                }
+            )
+        return JSONResponse({"predictions": predictions}, headers={"X-Model-Version": "stub"})
+
+    return app
+
+
+feed_app = make_feed_app()
+model_app = make_model_app()
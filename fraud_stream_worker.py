@@ -0,0 +1,426 @@
+"""Streaming fraud worker: fetch → prepare → predict → store, continuously.
+
+Runs the steps of the ``automatic_fraud_detection`` DAG (shared in
+``airflow/dags/fraud_pipeline.py``) as an asyncio pipeline instead of one
+DAG run per minute:
+
+    fetchers ──raw queue──▶ predictors ──scored queue──▶ writer
+
+- several fetchers poll the feed concurrently and drop the transactions
+  already seen (by ``trans_num``);
+- a predictor takes up to ``--batch-size`` transactions, waiting at most
+  ``--max-wait-ms`` for a batch to fill, prepares them in a thread and
+  scores them with one /predict/batch call;
+- the writer upserts everything scored since its last write in one
+  statement.
+
+A batch whose model call or write still fails after the retries is dropped
+and counted (``dropped_transactions`` / ``dropped_results`` in the stats);
+its ``trans_num`` values are forgotten, so the feed can bring them back.
+
+Both queues are bounded, so a slow model or database throttles the fetchers
+instead of growing memory. SIGINT/SIGTERM stop the fetchers, drain both
+queues, then close the database connections. Airflow only supervises the
+process, or runs the DAG for backfills.
+
+Usage:
+    python fraud_stream_worker.py --db-uri "$NEON_DB_URI"
+    python fraud_stream_worker.py --stub --duration 30   # offline: stub feed and model, no DB
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "airflow" / "dags"))
+
+from fraud_pipeline import (  # noqa: E402
+    DEFAULT_WRITE_METHOD,
+    FALLBACK_COLUMNS,
+    JEDHA_API,
+    MODEL_VERSION_HEADER,
+    SPACE_URL,
+    WRITE_METHODS,
+    batch_request,
+    columns_from_health,
+    connection_pool,
+    log_alerts,
+    migrate,
+    parse_feed,
+    parse_predictions,
+    pooled_connection,
+    prepare_batch,
+    upsert_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+# trans_num values remembered for deduplication
+SEEN_MAX = int(os.getenv("FRAUD_STREAM_SEEN_MAX", "100000"))
+# Attempts and first backoff of a failed model call or database write
+RETRIES = 3
+RETRY_BACKOFF_S = 0.5
+
+Scored = Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+async def collect(queue: asyncio.Queue, max_items: int, max_wait: float) -> List[Any]:
+    """Wait for one item, then take more until ``max_items`` or ``max_wait`` seconds"""
+    items = [await queue.get()]
+    deadline = time.monotonic() + max_wait
+    while len(items) < max_items:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            items.append(await asyncio.wait_for(queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return items
+
+
+async def retry(fn, what: str):
+    """Await ``fn()``, retrying with exponential backoff, re-raise after RETRIES attempts"""
+    for attempt in range(RETRIES):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == RETRIES - 1:
+                raise
+            delay = RETRY_BACKOFF_S * 2**attempt
+            logger.warning("%s failed (%s), retrying in %.1fs", what, e, delay)
+            await asyncio.sleep(delay)
+
+
+class LogWriter:
+    """Sink without a database: counts and logs the scored transactions"""
+
+    def open(self) -> None:
+        logger.warning("No database URI, scored transactions are only logged")
+
+    def write(self, transactions: Sequence[Dict[str, Any]], preds: Sequence[Dict[str, Any]]) -> int:
+        flagged = sum(p["prediction"] for p in preds)
+        logger.info("Scored %d transactions, %d flagged", len(preds), flagged)
+        return len(preds)
+
+    def close(self) -> None:
+        pass
+
+
+class PostgresWriter:
+    """Bulk upserts into fraud_transactions over pooled connections"""
+
+    def __init__(self, db_uri: str, method: str = DEFAULT_WRITE_METHOD):
+        self.db_uri = db_uri
+        self.method = method
+
+    def open(self) -> None:
+        with pooled_connection(self.db_uri) as conn, conn.cursor() as cur:
+            version = migrate(cur)
+        logger.info("Database schema at version %d, writes use %s upserts", version, self.method)
+
+    def write(self, transactions: Sequence[Dict[str, Any]], preds: Sequence[Dict[str, Any]]) -> int:
+        with pooled_connection(self.db_uri) as conn, conn.cursor() as cur:
+            return upsert_rows(cur, transactions, preds, method=self.method)
+
+    def close(self) -> None:
+        connection_pool(self.db_uri).closeall()
+
+
+class StreamWorker:
+    """Fetchers, predictors and a writer connected by bounded queues"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        writer,
+        feed_url: str = JEDHA_API,
+        model_url: str = SPACE_URL,
+        fetchers: int = 2,
+        poll_interval: float = 2.0,
+        predictors: int = 1,
+        batch_size: int = 256,
+        max_wait_ms: float = 500.0,
+        write_batches: int = 8,
+        queue_size: int = 2048,
+        schema_ttl: float = 300.0,
+        drain_timeout: float = 30.0,
+    ):
+        self.client = client
+        self.writer = writer
+        self.feed_url = feed_url
+        self.model_url = model_url.rstrip("/")
+        self.n_fetchers = fetchers
+        self.poll_interval = poll_interval
+        self.n_predictors = predictors
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.write_batches = write_batches
+        self.schema_ttl = schema_ttl
+        self.drain_timeout = drain_timeout
+
+        self.raw: asyncio.Queue = asyncio.Queue(queue_size)
+        # Counted in predictor batches, so it holds about as many rows as the raw queue
+        self.scored: asyncio.Queue = asyncio.Queue(max(1, queue_size // batch_size))
+        self._stopping = asyncio.Event()
+        self._seen: "collections.OrderedDict[str, None]" = collections.OrderedDict()
+        self._columns: List[str] = list(FALLBACK_COLUMNS)
+        self._columns_at = float("-inf")
+        self._model_version: Optional[str] = None
+        self.counters = collections.Counter()
+        self.write_seconds = 0.0
+        self.started = time.monotonic()
+
+    def stop(self) -> None:
+        """Ask the fetchers to stop; queued transactions are still scored and stored"""
+        if not self._stopping.is_set():
+            logger.info("Stopping: draining %d queued transactions", self.raw.qsize())
+            self._stopping.set()
+
+    def _is_new(self, tx: Dict[str, Any]) -> bool:
+        key = tx.get("trans_num")
+        if not key:
+            return True
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return False
+        self._seen[key] = None
+        if len(self._seen) > SEEN_MAX:
+            self._seen.popitem(last=False)
+        return True
+
+    def _forget(self, transactions: Sequence[Dict[str, Any]]) -> None:
+        """Drop lost transactions from the dedup set, so the feed can bring them back"""
+        for tx in transactions:
+            self._seen.pop(tx.get("trans_num"), None)
+
+    async def columns(self) -> List[str]:
+        """Model schema from /health, refreshed every ``schema_ttl`` seconds or on a new model"""
+        if time.monotonic() - self._columns_at < self.schema_ttl:
+            return self._columns
+        try:
+            resp = await self.client.get(self.model_url + "/health", timeout=10)
+            resp.raise_for_status()
+            health = resp.json()
+            self._columns = columns_from_health(health) or self._columns
+            self._model_version = health.get("model_version")
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("Health check failed (%s). Keeping %d columns.", e, len(self._columns))
+        self._columns_at = time.monotonic()
+        return self._columns
+
+    async def _fetch_loop(self, index: int) -> None:
+        # Staggered, so N fetchers poll N times per interval
+        await asyncio.sleep(self.poll_interval * index / self.n_fetchers)
+        while not self._stopping.is_set():
+            try:
+                resp = await self.client.get(self.feed_url, timeout=30)
+                resp.raise_for_status()
+                transactions = parse_feed(resp.text)
+            except (httpx.HTTPError, ValueError) as e:
+                self.counters["fetch_errors"] += 1
+                logger.warning("Fetcher %d: poll failed: %s", index, e)
+            else:
+                self.counters["polls"] += 1
+                for tx in transactions:
+                    if self._is_new(tx):
+                        self.counters["fetched"] += 1
+                        await self.raw.put(tx)  # blocks while the predictors are behind
+                    else:
+                        self.counters["duplicates"] += 1
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _score(self, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        columns = await self.columns()
+        # pandas work off the event loop, the fetchers keep polling meanwhile
+        payloads = await asyncio.to_thread(prepare_batch, transactions, columns)
+
+        async def call():
+            resp = await self.client.post(
+                self.model_url + "/predict/batch", json=batch_request(payloads), timeout=60
+            )
+            resp.raise_for_status()
+            served = resp.headers.get(MODEL_VERSION_HEADER)
+            if served and served != self._model_version:
+                logger.info("Model %s is serving, refreshing the schema", served)
+                self._columns_at = float("-inf")
+            return parse_predictions(resp.json(), len(payloads))
+
+        return await retry(call, "Model call")
+
+    async def _predict_loop(self) -> None:
+        while True:
+            batch = await collect(self.raw, self.batch_size, self.max_wait)
+            try:
+                preds = await self._score(batch)
+            except Exception as e:
+                self.counters["dropped_transactions"] += len(batch)
+                self._forget(batch)
+                logger.error("Dropping %d transactions, scoring failed: %s", len(batch), e)
+            else:
+                self.counters["scored"] += len(batch)
+                await self.scored.put((batch, preds))
+            finally:
+                for _ in batch:
+                    self.raw.task_done()
+
+    async def _write_loop(self) -> None:
+        while True:
+            items: List[Scored] = await collect(self.scored, self.write_batches, self.max_wait)
+            transactions = [tx for batch, _ in items for tx in batch]
+            preds = [pred for _, batch_preds in items for pred in batch_preds]
+            start = time.perf_counter()
+            try:
+                n_rows = await retry(
+                    lambda: asyncio.to_thread(self.writer.write, transactions, preds),
+                    "Database write",
+                )
+            except Exception as e:
+                self.counters["dropped_results"] += len(transactions)
+                self._forget(transactions)
+                logger.error("Dropping %d results, write failed: %s", len(transactions), e)
+            else:
+                self.counters["written"] += n_rows
+                self.counters["writes"] += 1
+                self.write_seconds += time.perf_counter() - start
+                self.counters["alerts"] += log_alerts(transactions, preds)
+            finally:
+                for _ in items:
+                    self.scored.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            # Losses are always reported, zero included, so they can be alerted on
+            "dropped_transactions": 0,
+            "dropped_results": 0,
+            **self.counters,
+            "raw_queue": self.raw.qsize(),
+            "scored_queue": self.scored.qsize(),
+            "elapsed_s": round(elapsed, 1),
+            "written_per_s": round(self.counters["written"] / elapsed, 1) if elapsed else 0.0,
+            # Throughput of the writes themselves, the database's share of the budget
+            "write_rows_per_s": (
+                round(self.counters["written"] / self.write_seconds, 1)
+                if self.write_seconds
+                else 0.0
+            ),
+        }
+
+    async def _report_loop(self, every: float) -> None:
+        while True:
+            await asyncio.sleep(every)
+            logger.info("Stream stats: %s", json.dumps(self.stats()))
+
+    async def run(self, duration: Optional[float] = None, report_every: float = 30.0) -> None:
+        """Run until ``stop()`` (or ``duration`` seconds), then drain and shut down"""
+        self.started = time.monotonic()
+        await asyncio.to_thread(self.writer.open)
+        await self.columns()
+        fetchers = [asyncio.create_task(self._fetch_loop(i)) for i in range(self.n_fetchers)]
+        workers = [asyncio.create_task(self._predict_loop()) for _ in range(self.n_predictors)]
+        workers.append(asyncio.create_task(self._write_loop()))
+        workers.append(asyncio.create_task(self._report_loop(report_every)))
+        try:
+            await asyncio.wait_for(self._stopping.wait(), duration)
+        except asyncio.TimeoutError:
+            self.stop()
+        finally:
+            self._stopping.set()
+            # Fetchers finish their current poll; predictors and writer empty the queues
+            await asyncio.gather(*fetchers, return_exceptions=True)
+            try:
+                await asyncio.wait_for(self._drain(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.error(
+                    "Drain timed out, %d queued and %d scored transactions lost",
+                    self.raw.qsize(),
+                    self.scored.qsize() * self.batch_size,
+                )
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.to_thread(self.writer.close)
+            logger.info("Stream worker stopped: %s", json.dumps(self.stats()))
+
+    async def _drain(self) -> None:
+        await self.raw.join()
+        await self.scored.join()
+
+
+def stub_client(rows_per_poll: int, latency_ms: float) -> httpx.AsyncClient:
+    """Client whose http://feed and http://model hosts are the in-process stubs"""
+    from fraud_stream_stubs import make_feed_app, make_model_app
+
+    return httpx.AsyncClient(
+        mounts={
+            "http://feed": httpx.ASGITransport(app=make_feed_app(rows_per_poll)),
+            "http://model": httpx.ASGITransport(app=make_model_app(latency_ms)),
+        }
+    )
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.stub:
+        client = stub_client(args.stub_rows, args.stub_latency_ms)
+        feed_url, model_url = "http://feed/current-transactions", "http://model"
+    else:
+        client = httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=args.fetchers + 4))
+        feed_url, model_url = args.feed_url, args.model_url
+    writer = PostgresWriter(args.db_uri, args.write_method) if args.db_uri else LogWriter()
+
+    async with client:
+        worker = StreamWorker(
+            client,
+            writer,
+            feed_url=feed_url,
+            model_url=model_url,
+            fetchers=args.fetchers,
+            poll_interval=args.poll_interval,
+            predictors=args.predictors,
+            batch_size=args.batch_size,
+            max_wait_ms=args.max_wait_ms,
+            queue_size=args.queue_size,
+        )
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run(args.duration, args.report_every)
+    return worker.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--feed-url", default=os.getenv("JEDHA_API", JEDHA_API))
+    parser.add_argument("--model-url", default=os.getenv("SPACE_URL", SPACE_URL))
+    parser.add_argument("--db-uri", default=os.getenv("NEON_DB_URI"), help="omit to only log")
+    parser.add_argument("--write-method", choices=WRITE_METHODS, default=DEFAULT_WRITE_METHOD)
+    parser.add_argument("--fetchers", type=int, default=2)
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds per fetcher")
+    parser.add_argument("--predictors", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=500.0)
+    parser.add_argument("--queue-size", type=int, default=2048)
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--report-every", type=float, default=30.0, help="seconds between stats")
+    parser.add_argument("--stub", action="store_true", help="in-process stub feed and model")
+    parser.add_argument("--stub-rows", type=int, default=50, help="stub feed rows per poll")
+    parser.add_argument("--stub-latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per request otherwise
+    print(json.dumps(asyncio.run(main(args)), indent=2))
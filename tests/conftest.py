@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# fraud_scoring is imported from the repository root, as the APIs do
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,135 @@
+"""Compiled scorer and memory-mapped weights versus sklearn predict_proba"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from fraud_scoring.compiled import PARITY_TOLERANCE, compile_pipeline
+from fraud_scoring.weights import export_weights, load_weights
+
+NUMERIC = ["amt", "city_pop", "lat", "long"]
+CATEGORICAL = ["category", "gender", "state"]
+LEVELS = {
+    "category": ["grocery_pos", "gas_transport", "shopping_net", "misc_pos"],
+    "gender": ["F", "M"],
+    "state": ["NY", "CA", "TX", "FL", "WA"],
+}
+
+
+def transactions(n: int, seed: int, unseen: float = 0.0) -> pd.DataFrame:
+    """Synthetic rows in the training layout, ``unseen`` of categories never fitted"""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(
+        {
+            "amt": rng.lognormal(4.2, 1.2, n),
+            "city_pop": rng.integers(100, 2_000_000, n).astype(float),
+            "lat": rng.uniform(30, 45, n),
+            "long": rng.uniform(-120, -75, n),
+        }
+    )
+    for col, levels in LEVELS.items():
+        values = rng.choice(levels, n).astype(object)
+        values[rng.random(n) < unseen] = f"unseen_{col}"
+        frame[col] = values
+    return frame
+
+
+def labels(frame: pd.DataFrame) -> np.ndarray:
+    return ((frame["amt"] > 200) & (frame["category"] != "grocery_pos")).astype(int).values
+
+
+def fit(classifier) -> Pipeline:
+    pipeline = Pipeline(
+        [
+            (
+                "preproc",
+                ColumnTransformer(
+                    [
+                        ("num", StandardScaler(), NUMERIC),
+                        ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL),
+                    ]
+                ),
+            ),
+            ("clf", classifier),
+        ]
+    )
+    train = transactions(500, seed=0)
+    return pipeline.fit(train, labels(train))
+
+
+@pytest.fixture(
+    scope="module",
+    params=[
+        pytest.param(lambda: LogisticRegression(max_iter=1000), id="logistic_regression"),
+        pytest.param(
+            lambda: RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0),
+            id="random_forest",
+        ),
+    ],
+)
+def pipeline(request) -> Pipeline:
+    return fit(request.param())
+
+
+@pytest.fixture(scope="module")
+def frame() -> pd.DataFrame:
+    return transactions(300, seed=1, unseen=0.1)
+
+
+def assert_parity(scorer, pipeline: Pipeline, frame: pd.DataFrame) -> None:
+    expected = pipeline.predict_proba(frame)[:, 1]
+    rows = frame.to_dict("records")
+    columns = {col: frame[col].tolist() for col in frame.columns}
+
+    np.testing.assert_allclose(scorer.predict_many(rows), expected, rtol=0, atol=PARITY_TOLERANCE)
+    np.testing.assert_allclose(
+        scorer.predict_columns(columns, len(frame)), expected, rtol=0, atol=PARITY_TOLERANCE
+    )
+    single = np.array([scorer.predict_one(row) for row in rows[:50]])
+    np.testing.assert_allclose(single, expected[:50], rtol=0, atol=PARITY_TOLERANCE)
+
+
+def test_unseen_categories_present(frame):
+    assert frame["state"].str.startswith("unseen_").any()
+
+
+def test_compiled_parity(pipeline, frame):
+    assert_parity(compile_pipeline(pipeline), pipeline, frame)
+
+
+def test_weights_round_trip(pipeline, frame, tmp_path):
+    scorer = compile_pipeline(pipeline)
+    export_weights(scorer, tmp_path, source_sha256="test")
+    loaded = load_weights(tmp_path)
+
+    assert loaded.kind == scorer.kind
+    assert loaded.numeric_cols == NUMERIC
+    assert loaded.categorical_cols == CATEGORICAL
+    assert isinstance(loaded.scale.base, np.memmap)
+    assert_parity(loaded, pipeline, frame)
+
+
+def test_unsupported_encoder_refused():
+    pipeline = Pipeline(
+        [
+            (
+                "preproc",
+                ColumnTransformer(
+                    [
+                        ("num", StandardScaler(), NUMERIC),
+                        ("cat", OneHotEncoder(handle_unknown="error"), CATEGORICAL),
+                    ]
+                ),
+            ),
+            ("clf", LogisticRegression(max_iter=1000)),
+        ]
+    )
+    train = transactions(200, seed=0)
+    pipeline.fit(train, labels(train))
+    with pytest.raises(ValueError, match="handle_unknown"):
+        compile_pipeline(pipeline)